@@ -0,0 +1,56 @@
+# what radium needs from whatever plays its audio
+#
+# a song is a path plus a tag (whatever the player likes), and the tag is what the callbacks hand back
+# the backend asks for what to play next rather than being told: a little before a song ends,
+# nextTrack() is asked for the (path, tag) to play after it (or None), then onTrackChanged(tag) is called
+# once that song has taken over, or onEnd() when a song runs out with nothing after it
+# nextTrack() should only peek at what's next: until onTrackChanged, the player may change its mind and call dropNext()
+#
+# the callbacks are called from the backend's own threads (never while it holds a lock of its own),
+# and pausing is a state of its own: a song played while paused is loaded, but waits for unpause to start
+class AudioBackend:
+    def __init__(self, nextTrack, onTrackChanged, onEnd):
+        self.nextTrack = nextTrack
+        self.onTrackChanged = onTrackChanged
+        self.onEnd = onEnd
+
+    # cuts straight to the given song, startMs into it
+    def play(self, path, tag=None, startMs=0):
+        raise NotImplementedError
+
+    # moves within the current song
+    def seek(self, ms):
+        raise NotImplementedError
+
+    def stop(self):
+        raise NotImplementedError
+
+    def pause(self):
+        raise NotImplementedError
+
+    def unpause(self):
+        raise NotImplementedError
+
+    # from 0 to 1
+    def setVolume(self, volume):
+        raise NotImplementedError
+
+    # position (in ms) within the current song
+    def getPos(self):
+        raise NotImplementedError
+
+    # the current song's length in ms, or -1 if the backend doesn't know it
+    def getLength(self):
+        return -1
+
+    # forgets what nextTrack() gave for after the current song (if it's been asked yet), so it's asked again
+    # (once the next song has started taking over, it's too late, and onTrackChanged still comes)
+    def dropNext(self):
+        pass
+
+    # how long a song overlaps the one after it, for backends that can crossfade
+    def setOverlap(self, overlapMs):
+        pass
+
+    def close(self):
+        self.stop()
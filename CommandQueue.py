@@ -0,0 +1,114 @@
+import threading
+import time
+from collections import deque, namedtuple
+
+# a command that's merged into the one queued right before it, if that one has the same key (and hasn't started yet)
+# func is called with the amount: the amounts added up if summed, or else just the newest one
+MergedCommand = namedtuple("MergedCommand", ["key", "func", "amount", "summed"])
+
+
+# the last few hundred timings (in seconds) of something, for a quick summary
+class LatencyLog:
+    def __init__(self, size=256):
+        self.times = deque(maxlen=size)
+        self.count = 0
+        self.worst = 0
+
+    def record(self, seconds):
+        self.times.append(seconds)
+        self.count += 1
+        self.worst = max(self.worst, seconds)
+
+    def describe(self):
+        if(not self.times):
+            return "no samples"
+        ordered = sorted(self.times)
+        median = ordered[len(ordered) // 2]
+        high = ordered[min(len(ordered) - 1, len(ordered) * 99 // 100)]
+        return f"median {median * 1e6:.0f}us, 99th {high * 1e6:.0f}us, worst {self.worst * 1e6:.0f}us ({self.count} samples)"
+
+
+# runs commands one at a time, in the order they were put in, on its own thread,
+# so whoever puts them in (like the key hook) never waits on them
+#
+# a command is either a plain function, or a MergedCommand
+class CommandQueue:
+    def __init__(self):
+        # (command, time it was put in)
+        self.pending = deque()
+        self.condition = threading.Condition()
+        # time from a command being put in to it starting
+        self.waitLatency = LatencyLog()
+        self.closed = False
+        # the events call() is waiting on, so closing can let every caller go
+        self.waiting = set()
+
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def put(self, command):
+        with self.condition:
+            if(self.closed):
+                return
+            last = self.pending[-1][0] if self.pending else None
+            if(isinstance(command, MergedCommand) and isinstance(last, MergedCommand) and last.key == command.key):
+                if(command.summed):
+                    command = command._replace(amount=last.amount + command.amount)
+                self.pending[-1] = (command, self.pending[-1][1])
+            else:
+                self.pending.append((command, time.perf_counter()))
+                self.condition.notify()
+
+    # puts func in and waits for it to run, then returns what it returned (or None if it raised)
+    def call(self, func):
+        if(threading.current_thread() is self.thread):
+            return func()
+        done = threading.Event()
+        result = list()
+
+        def command():
+            try:
+                result.append(func())
+            finally:
+                done.set()
+        with self.condition:
+            if(self.closed):
+                return None
+            self.waiting.add(done)
+        self.put(command)
+        done.wait()
+        with self.condition:
+            self.waiting.discard(done)
+        return result[0] if result else None
+
+    # stops the worker: whatever hasn't started yet is dropped (as is anything put in from now on),
+    # and the command that's running, if any, is left to finish
+    # (waiting for it deadlocks if it's waiting on the caller, so that's only done if wait is set)
+    def close(self, wait=True):
+        with self.condition:
+            self.closed = True
+            self.pending.clear()
+            # (calls still waiting are let go, with None)
+            for done in self.waiting:
+                done.set()
+            self.condition.notify()
+        if(wait and threading.current_thread() is not self.thread):
+            self.thread.join()
+
+    def _run(self):
+        while True:
+            with self.condition:
+                while(not self.pending and not self.closed):
+                    self.condition.wait()
+                if(self.closed):
+                    return
+                command, putTime = self.pending.popleft()
+            self.waitLatency.record(time.perf_counter() - putTime)
+
+            try:
+                if(isinstance(command, MergedCommand)):
+                    command.func(command.amount)
+                else:
+                    command()
+            except BaseException as excep:
+                print(excep)
@@ -0,0 +1,108 @@
+import os
+from collections import deque
+
+
+# the last capacity (song local path, time in ms) entries that were played, newest last
+# the oldest entry falls off the front on its own once the log is full
+#
+# with a path, every push and pop is appended to the file as it happens (so a crash loses nothing),
+# and the file is replayed on startup; it's rewritten from scratch once it holds a lot of dead lines
+class HistoryLog:
+    def __init__(self, path, capacity):
+        self.path = path
+        self.capacity = max(1, capacity)
+        self.entries = deque(maxlen=self.capacity)
+        self.file = None
+        self.fileLines = 0
+        if(self.path):
+            self.load()
+            if(not self.file):
+                try:
+                    self.file = open(self.path, "a", encoding="utf-8")
+                except OSError as excep:
+                    print(excep)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def load(self):
+        if(not os.path.exists(self.path)):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as logFile:
+                for line in logFile:
+                    self.fileLines += 1
+                    # a line cut off by a crash is dropped (and has to go before anything else is appended)
+                    if(not line.endswith("\n")):
+                        self.fileLines = 2 * self.capacity + 1
+                        break
+                    if(line == "-\n"):
+                        if(self.entries):
+                            self.entries.pop()
+                        continue
+                    timeMs, _, localPath = line[:-1].partition("\t")
+                    if(timeMs.isdigit() and localPath):
+                        self.entries.append((localPath, int(timeMs)))
+        except OSError as excep:
+            print(excep)
+            return
+        if(self.fileLines > 2 * self.capacity):
+            self.rewrite()
+
+    def push(self, localPath, timeMs):
+        self.entries.append((localPath, int(timeMs)))
+        self.write(f"{int(timeMs)}\t{localPath}\n")
+
+    def pop(self):
+        if(not self.entries):
+            return None
+        entry = self.entries.pop()
+        self.write("-\n")
+        return entry
+
+    def last(self):
+        return self.entries[-1] if self.entries else None
+
+    # drops every entry for the given songs (a set of local paths)
+    def remove(self, localPaths):
+        if(not any(entry[0] in localPaths for entry in self.entries)):
+            return
+        kept = [entry for entry in self.entries if entry[0] not in localPaths]
+        self.entries.clear()
+        self.entries.extend(kept)
+        self.rewrite()
+
+    def write(self, line):
+        if(not self.file):
+            return
+        try:
+            self.file.write(line)
+            self.file.flush()
+        except OSError as excep:
+            print(excep)
+        self.fileLines += 1
+        # pops and entries that have fallen off the front are dead weight in the file
+        if(self.fileLines > 2 * self.capacity):
+            self.rewrite()
+
+    def rewrite(self):
+        if(not self.path):
+            return
+        try:
+            tempPath = self.path + ".tmp"
+            with open(tempPath, "w", encoding="utf-8") as logFile:
+                for localPath, timeMs in self.entries:
+                    logFile.write(f"{timeMs}\t{localPath}\n")
+            if(self.file):
+                self.file.close()
+            os.replace(tempPath, self.path)
+            self.file = open(self.path, "a", encoding="utf-8")
+        except OSError as excep:
+            print(excep)
+            return
+        self.fileLines = len(self.entries)
+
+    def close(self):
+        if(self.file):
+            self.file.close()
+            self.file = None
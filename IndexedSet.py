@@ -0,0 +1,61 @@
+import random
+
+
+# a set that also keeps its items in a list, so a uniformly random item can be picked in O(1)
+# removing an item moves the last item into its slot, so the list never has gaps
+class IndexedSet:
+    def __init__(self, items=()):
+        self.items = list()
+        # item -> index in items
+        self.positions = dict()
+        # bumped on every change, so whatever is built from the items can tell when it's out of date
+        self.version = 0
+        self.update(items)
+
+    def __len__(self):
+        return len(self.items)
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __contains__(self, item):
+        return item in self.positions
+
+    def add(self, item):
+        if(item not in self.positions):
+            self.positions[item] = len(self.items)
+            self.items.append(item)
+            self.version += 1
+
+    def discard(self, item):
+        pos = self.positions.pop(item, None)
+        if(pos is None):
+            return
+        self.version += 1
+        last = self.items.pop()
+        if(pos < len(self.items)):
+            self.items[pos] = last
+            self.positions[last] = pos
+
+    def update(self, items):
+        for item in items:
+            self.add(item)
+
+    def difference_update(self, items):
+        for item in items:
+            self.discard(item)
+
+    def intersection_update(self, items):
+        keep = set(item for item in items if item in self.positions)
+        self.items = [item for item in self.items if item in keep]
+        self.positions = {self.items[pos]: pos for pos in range(len(self.items))}
+        self.version += 1
+
+    def clear(self):
+        self.items.clear()
+        self.positions.clear()
+        self.version += 1
+
+    # raises IndexError when empty, like random.choice
+    def choice(self):
+        return random.choice(self.items)
@@ -0,0 +1,163 @@
+import os
+import pickle
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from StringSearch import makeSearchable
+
+cacheVersion = 1
+
+
+# splits a library file name into (file type, song name, searchable name)
+# song names drop the extension and anything after an @ (e.g. youtube ids)
+def describeFile(fileName):
+    fileNameParts = fileName.split(".")
+    fileType = fileNameParts[-1]
+    songName = "".join(fileNameParts[:-1]).split("@")[0]
+    return fileType, songName, makeSearchable(songName)
+
+
+# remembers the listing of every library directory, keyed by the directory's mtime
+# a directory's mtime changes whenever an entry is added, removed or renamed in it,
+# so only directories whose mtime differs from the cached one need to be listed again
+class LibraryCache:
+    def __init__(self, cachePath, audioDirectory, acceptedAudioTypes, scanWorkers=1):
+        self.cachePath = cachePath
+        self.audioDirectory = audioDirectory
+        self.acceptedAudioTypes = acceptedAudioTypes
+        self.scanWorkers = scanWorkers
+
+        # local path -> (mtime, subfolder names, [(file name, file type, song name, searchable name)])
+        self.dirs = dict()
+        self.visitedDirs = dict()
+        # directories that have been listed again (rather than read back from the cache), since they're new or changed
+        self.changedDirs = set()
+        self.dirty = False
+        self.load()
+
+    def load(self):
+        if(not self.cachePath or not os.path.exists(self.cachePath)):
+            return
+        try:
+            with open(self.cachePath, "rb") as cacheFile:
+                data = pickle.load(cacheFile)
+        except (OSError, EOFError, pickle.UnpicklingError) as excep:
+            print(excep)
+            return
+
+        # a cache for a different library (or different audio types) is useless
+        if(data.get("version") != cacheVersion
+                or data.get("audio directory") != self.audioDirectory
+                or data.get("accepted audio types") != sorted(self.acceptedAudioTypes)):
+            return
+        self.dirs = data["dirs"]
+
+    def save(self):
+        # directories that weren't visited this time no longer exist
+        if(not self.cachePath or (not self.dirty and len(self.visitedDirs) == len(self.dirs))):
+            return
+        data = {
+            "version": cacheVersion,
+            "audio directory": self.audioDirectory,
+            "accepted audio types": sorted(self.acceptedAudioTypes),
+            "dirs": self.visitedDirs,
+        }
+        try:
+            tempPath = self.cachePath + ".tmp"
+            with open(tempPath, "wb") as cacheFile:
+                pickle.dump(data, cacheFile, pickle.HIGHEST_PROTOCOL)
+            os.replace(tempPath, self.cachePath)
+        except OSError as excep:
+            print(excep)
+            return
+        self.dirs = self.visitedDirs
+        self.dirty = False
+
+    # drops a directory (and everything under it) that has gone from the library
+    def forget(self, localPath):
+        prefix = localPath + os.sep
+        for path in [path for path in self.visitedDirs if path == localPath or path.startswith(prefix)]:
+            del self.visitedDirs[path]
+        self.dirty = True
+
+    # yields (local path, subfolder names, files) for every library directory under localPath, in os.walk order
+    # folders starting with . (and symlinked folders) are skipped
+    #
+    # with more than one scan worker, directories are listed on a thread pool:
+    # as soon as a directory has been listed, its subfolders are queued up to be listed too,
+    # while the results are still handed out in the same order as a plain walk
+    def walk(self, localPath="."):
+        if(self.scanWorkers <= 1):
+            yield from self._walk(localPath, self.listDir)
+            return
+
+        pending = dict()
+        pendingLock = threading.Lock()
+        with ThreadPoolExecutor(max_workers=self.scanWorkers) as pool:
+            def queueDir(path):
+                with pendingLock:
+                    if(path in pending):
+                        return pending[path]
+                    future = pool.submit(self.listDir, path)
+                    pending[path] = future
+                future.add_done_callback(lambda done: queueSubDirs(path, done))
+                return future
+
+            def queueSubDirs(path, future):
+                listing = future.result()
+                if(listing is not None):
+                    for name in listing[1]:
+                        queueDir(os.path.normpath(os.path.join(path, name)))
+
+            yield from self._walk(localPath, lambda path: queueDir(path).result())
+
+    def _walk(self, localPath, listDir):
+        listing = listDir(localPath)
+        if(listing is None):
+            return
+        _, dirs, files = listing
+        yield localPath, dirs, files
+        for name in dirs:
+            yield from self._walk(os.path.normpath(os.path.join(localPath, name)), listDir)
+
+    # returns (mtime, subfolder names, files), or None if the directory can't be read
+    # force lists the directory even if its mtime matches (mtimes can be too coarse to see quick changes)
+    def listDir(self, localPath, force=False):
+        path = os.path.join(self.audioDirectory, localPath)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            self.visitedDirs.pop(localPath, None)
+            return None
+
+        cached = self.visitedDirs.get(localPath) or self.dirs.get(localPath)
+        if(cached and cached[0] == mtime and not force):
+            self.visitedDirs[localPath] = cached
+            return cached
+
+        listing = self.scanDir(path, mtime)
+        if(listing is None):
+            self.visitedDirs.pop(localPath, None)
+            return None
+        self.visitedDirs[localPath] = listing
+        self.changedDirs.add(localPath)
+        self.dirty = True
+        return listing
+
+    def scanDir(self, path, mtime):
+        dirs = list()
+        files = list()
+        try:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    if(entry.is_dir() and not entry.is_symlink()):
+                        if(entry.name[0] != "."):
+                            dirs.append(entry.name)
+                        continue
+
+                    fileType, songName, searchableName = describeFile(entry.name)
+                    if(fileType == "smco" or fileType in self.acceptedAudioTypes):
+                        files.append((entry.name, fileType, songName, searchableName))
+        except OSError:
+            return None
+        return (mtime, dirs, files)
@@ -0,0 +1,178 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+import time
+
+# inotify event flags (from <sys/inotify.h>)
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+
+dirEntryEvents = IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO | IN_DELETE_SELF | IN_MOVE_SELF
+inotifyEventHeader = struct.Struct("iIII")
+
+
+class Inotify:
+    def __init__(self):
+        self.libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self.fd = self.libc.inotify_init1(os.O_CLOEXEC | os.O_NONBLOCK)
+        if(self.fd < 0):
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+    def addWatch(self, path, mask):
+        return self.libc.inotify_add_watch(self.fd, os.fsencode(path), mask)
+
+    def removeWatch(self, wd):
+        self.libc.inotify_rm_watch(self.fd, wd)
+
+    # waits up to timeout seconds, then returns the (wd, mask, name) of every event read
+    def read(self, timeout):
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if(not ready):
+            return []
+        try:
+            buffer = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+
+        events = list()
+        pos = 0
+        while(pos + inotifyEventHeader.size <= len(buffer)):
+            wd, mask, _, nameLen = inotifyEventHeader.unpack_from(buffer, pos)
+            pos += inotifyEventHeader.size
+            name = buffer[pos:pos + nameLen].rstrip(b"\0")
+            pos += nameLen
+            events.append((wd, mask, os.fsdecode(name)))
+        return events
+
+    def close(self):
+        os.close(self.fd)
+
+
+# watches library directories for added, removed and renamed entries
+# onDirsChanged is called (on the watcher's thread) with the set of local paths of changed directories,
+# once things have been quiet for settleTime seconds
+#
+# uses inotify on linux, and otherwise polls every watched directory's mtime every pollInterval seconds
+class LibraryWatcher:
+    def __init__(self, audioDirectory, onDirsChanged, pollInterval=0.5, settleTime=0.2):
+        self.audioDirectory = audioDirectory
+        self.onDirsChanged = onDirsChanged
+        self.pollInterval = pollInterval
+        self.settleTime = settleTime
+
+        self.running = False
+        self.thread = None
+        self.lock = threading.Lock()
+
+        # local path -> mtime (polling) or watch descriptor (inotify)
+        self.watched = dict()
+        self.watchPaths = dict()
+        self.inotify = None
+        if(sys.platform.startswith("linux")):
+            try:
+                self.inotify = Inotify()
+            except (OSError, AttributeError) as excep:
+                print(excep)
+
+    def watchDir(self, localPath):
+        path = os.path.join(self.audioDirectory, localPath)
+        with self.lock:
+            if(localPath in self.watched):
+                return
+            if(self.inotify):
+                wd = self.inotify.addWatch(path, dirEntryEvents | IN_ONLYDIR)
+                if(wd < 0):
+                    return
+                self.watched[localPath] = wd
+                self.watchPaths[wd] = localPath
+            else:
+                self.watched[localPath] = self._mtime(path)
+
+    def unwatchDir(self, localPath):
+        with self.lock:
+            watch = self.watched.pop(localPath, None)
+            if(self.inotify and watch is not None):
+                self.watchPaths.pop(watch, None)
+                self.inotify.removeWatch(watch)
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        if(self.thread and self.thread is not threading.current_thread()):
+            self.thread.join()
+        self.thread = None
+        if(self.inotify):
+            self.inotify.close()
+            self.inotify = None
+
+    def _run(self):
+        changed = set()
+        lastChange = 0
+        while(self.running):
+            if(self.inotify):
+                found = self._readInotify(self.settleTime / 2)
+            else:
+                time.sleep(self.pollInterval)
+                found = self._poll()
+
+            if(found):
+                changed |= found
+                lastChange = time.monotonic()
+            elif(changed and time.monotonic() - lastChange >= self.settleTime):
+                try:
+                    self.onDirsChanged(changed)
+                except BaseException as excep:
+                    print(excep)
+                changed = set()
+
+    def _readInotify(self, timeout):
+        found = set()
+        events = self.inotify.read(timeout)
+        with self.lock:
+            for wd, mask, _ in events:
+                if(mask & IN_Q_OVERFLOW):
+                    found |= set(self.watched)
+                    continue
+                localPath = self.watchPaths.get(wd)
+                if(localPath is None):
+                    continue
+                if(mask & IN_IGNORED):
+                    # the kernel already dropped this watch (the directory is gone)
+                    del self.watchPaths[wd]
+                    self.watched.pop(localPath, None)
+                found.add(localPath)
+        return found
+
+    def _poll(self):
+        found = set()
+        with self.lock:
+            watched = list(self.watched.items())
+        for localPath, mtime in watched:
+            newMtime = self._mtime(os.path.join(self.audioDirectory, localPath))
+            if(newMtime != mtime):
+                found.add(localPath)
+                with self.lock:
+                    if(localPath in self.watched):
+                        self.watched[localPath] = newMtime
+        return found
+
+    def _mtime(self, path):
+        try:
+            return os.stat(path).st_mtime_ns
+        except OSError:
+            return None
@@ -0,0 +1,213 @@
+import os
+import pickle
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from StringSearch import SearchIndex, makeSearchable
+
+try:
+    import mutagen
+except ImportError:
+    mutagen = None
+
+cacheVersion = 1
+# probed files between saves, so a long first probe isn't lost if radium quits partway through
+saveEvery = 500
+# files handed to a probe worker at a time
+probeBatch = 64
+
+# length is in ms and bitrate in bits per second (-1 if unknown); tags are "" if missing
+Metadata = namedtuple("Metadata", ["length", "bitrate", "title", "artist", "album", "year"])
+unknownMetadata = Metadata(length=-1, bitrate=-1, title="", artist="", album="", year="")
+
+
+# reads a file's duration, bitrate and tags with mutagen
+# (None if it couldn't be read at all, as opposed to unknownMetadata for a file mutagen doesn't know what to make of)
+def readMetadata(path):
+    if(mutagen is None):
+        return None
+    try:
+        info = mutagen.File(path, easy=True)
+    except Exception as excep:
+        print(excep)
+        return None
+    if(info is None):
+        return unknownMetadata
+
+    def tag(key):
+        values = (info.tags or {}).get(key) or [""]
+        return str(values[0]).strip()
+
+    return Metadata(
+        length=round(info.info.length * 1000) if getattr(info.info, "length", None) else -1,
+        bitrate=getattr(info.info, "bitrate", -1) or -1,
+        title=tag("title"),
+        artist=tag("artist"),
+        album=tag("album"),
+        year=tag("date")[:4]
+    )
+
+
+# remembers every library file's metadata, keyed by the file's mtime and size,
+# and probes the files that are new or changed on a pool of background workers
+class MetadataCache:
+    def __init__(self, cachePath, audioDirectory, probeWorkers=4):
+        self.cachePath = cachePath
+        self.audioDirectory = audioDirectory
+
+        # local path -> (mtime, size, metadata)
+        self.files = dict()
+        # changes since the cache was last saved, and ever
+        self.unsaved = 0
+        self.changes = 0
+        self.lock = threading.Lock()
+        self.saveLock = threading.Lock()
+        self.pool = ThreadPoolExecutor(max_workers=max(1, probeWorkers))
+        self.pending = 0
+        self.load()
+
+    def load(self):
+        if(not self.cachePath or not os.path.exists(self.cachePath)):
+            return
+        try:
+            with open(self.cachePath, "rb") as cacheFile:
+                data = pickle.load(cacheFile)
+        except (OSError, EOFError, pickle.UnpicklingError) as excep:
+            print(excep)
+            return
+
+        if(data.get("version") != cacheVersion or data.get("audio directory") != self.audioDirectory):
+            return
+        self.files = data["files"]
+
+    def save(self):
+        # workers can finish at the same time, but only one of them should be writing the file
+        with self.saveLock:
+            with self.lock:
+                if(not self.cachePath or not self.unsaved):
+                    return
+                data = {
+                    "version": cacheVersion,
+                    "audio directory": self.audioDirectory,
+                    "files": dict(self.files),
+                }
+                self.unsaved = 0
+            try:
+                tempPath = self.cachePath + ".tmp"
+                with open(tempPath, "wb") as cacheFile:
+                    pickle.dump(data, cacheFile, pickle.HIGHEST_PROTOCOL)
+                os.replace(tempPath, self.cachePath)
+            except OSError as excep:
+                print(excep)
+
+    # the cached metadata for a file (without checking that it's still current), or None if it hasn't been probed
+    def get(self, localPath):
+        cached = self.files.get(localPath)
+        return cached[2] if cached else None
+
+    # the file's metadata, probing it right away if it isn't known yet (or None if it can't be read)
+    def require(self, localPath):
+        return self.get(localPath) or self.probe(localPath)
+
+    # probes the given files in the background (skipping the ones that haven't changed),
+    # saving the cache every so often and once they're all done
+    # (without mutagen, nothing can be read, so nothing is probed)
+    def probeAll(self, localPaths):
+        if(mutagen is None):
+            return
+        with self.lock:
+            localPaths = list(localPaths)
+            self.pending += len(localPaths)
+        for start in range(0, len(localPaths), probeBatch):
+            self.pool.submit(self._probeQueued, localPaths[start:start + probeBatch])
+
+    def _probeQueued(self, localPaths):
+        for localPath in localPaths:
+            try:
+                self.probe(localPath)
+            except BaseException as excep:
+                print(excep)
+            with self.lock:
+                self.pending -= 1
+                due = self.pending == 0 or self.unsaved >= saveEvery
+            if(due):
+                self.save()
+
+    def probe(self, localPath):
+        path = os.path.join(self.audioDirectory, localPath)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            self.forget(localPath)
+            return None
+
+        cached = self.files.get(localPath)
+        if(cached and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size):
+            return cached[2]
+
+        metadata = readMetadata(path)
+        # (a file that couldn't be read isn't remembered, so it's tried again next time)
+        if(metadata is None):
+            return None
+        with self.lock:
+            self.files[localPath] = (stat.st_mtime_ns, stat.st_size, metadata)
+            self.unsaved += 1
+            self.changes += 1
+        return metadata
+
+    # drops every file that isn't one of the given ones
+    def retain(self, localPaths):
+        localPaths = set(localPaths)
+        with self.lock:
+            for localPath in [path for path in self.files if path not in localPaths]:
+                del self.files[localPath]
+                self.unsaved += 1
+                self.changes += 1
+
+    # stops probing (whatever is still queued is dropped), and saves what has been probed
+    def close(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
+        self.save()
+
+    def forget(self, localPath):
+        with self.lock:
+            if(self.files.pop(localPath, None)):
+                self.unsaved += 1
+                self.changes += 1
+
+
+# searches songs by their tags, one field at a time
+# each field has a SearchIndex over its distinct (searchable) values, and the positions of the songs with each value,
+# so a search ranks the values like any other search, then hands back every song with the best one
+class TagIndex:
+    fields = ("title", "artist", "album", "year")
+
+    # (songs are given by their local paths)
+    def __init__(self, localPaths, metadataCache):
+        # field -> value -> positions in localPaths
+        self.valueSongs = {field: dict() for field in TagIndex.fields}
+        for pos in range(len(localPaths)):
+            metadata = metadataCache.get(localPaths[pos])
+            if(not metadata):
+                continue
+            for field in TagIndex.fields:
+                value = makeSearchable(getattr(metadata, field))
+                if(value):
+                    self.valueSongs[field].setdefault(value, []).append(pos)
+
+        self.valueIndexes = dict()
+        for field, values in self.valueSongs.items():
+            names = sorted(values, key=lambda value: (len(value), value))
+            self.valueIndexes[field] = SearchIndex(names)
+
+    # positions of the songs (within [start, end), if given) whose field best matches term
+    def search(self, field, term, start=None, end=None):
+        index = self.valueIndexes[field]
+        for i in index.search(term, len(index)):
+            positions = self.valueSongs[field][index.names[i]]
+            if(start is not None):
+                positions = [pos for pos in positions if start <= pos < end]
+            if(positions):
+                return positions
+        return []
@@ -0,0 +1,396 @@
+import collections
+import os
+import shutil
+import subprocess
+import threading
+import time
+
+import pygame
+
+from AudioBackend import AudioBackend
+from CommandQueue import CommandQueue
+from MetadataCache import readMetadata
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+mixer = pygame.mixer
+
+
+# streams a file's audio as raw 16 bit samples in the mixer's format, a little at a time,
+# by piping it through ffmpeg
+class FfmpegDecoder:
+    def __init__(self, path, startMs, frequency, channels):
+        self.process = subprocess.Popen(
+            ["ffmpeg", "-nostdin", "-loglevel", "error", "-ss", f"{startMs / 1000:.3f}", "-i", path,
+             "-f", "s16le", "-ac", str(channels), "-ar", str(frequency), "-"],
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+
+    def read(self, size):
+        return self.process.stdout.read(size)
+
+    # (ffmpeg doesn't say, so this is left to the song's metadata)
+    def lengthMs(self):
+        return -1
+
+    def close(self):
+        self.process.kill()
+        self.process.wait()
+
+
+# a file's length in ms from its metadata, or if that can't be read, a guess from its size
+# (taking it to be 128kbps, which overestimates anything but low bitrate files)
+def guessLengthMs(path):
+    metadata = readMetadata(path)
+    if(metadata and metadata.length > 0):
+        return metadata.length
+    return os.path.getsize(path) * 8 // 128
+
+
+# without ffmpeg, pygame decodes the whole file up front, but seeking within it is then just moving along the decoded audio
+# (to keep that bounded, files longer than maxDecodeMs are refused; with ffmpeg, they're streamed like the rest)
+class SoundDecoder:
+    # about 160MB of 16 bit stereo at 44.1kHz
+    maxDecodeMs = 15 * 60 * 1000
+
+    def __init__(self, path, startMs, frequency, channels):
+        lengthMs = guessLengthMs(path)
+        if(lengthMs > SoundDecoder.maxDecodeMs):
+            raise ValueError(
+                f"\"{path}\" is too long to play without ffmpeg "
+                f"(about {lengthMs // 60000} minutes, and the limit is {SoundDecoder.maxDecodeMs // 60000}), so install ffmpeg to stream it")
+        # the samples are read straight out of the sound, so only the one decoded copy is held
+        self.sound = mixer.Sound(path)
+        self.raw = memoryview(self.sound.get_view()).cast("B")
+        self.frequency = frequency
+        self.frameSize = channels * 2
+        self.seek(startMs)
+
+    def seek(self, ms):
+        self.pos = min(len(self.raw), (ms * self.frequency // 1000) * self.frameSize)
+
+    def read(self, size):
+        chunk = bytes(self.raw[self.pos:self.pos + size])
+        self.pos += len(chunk)
+        return chunk
+
+    def lengthMs(self):
+        return len(self.raw) // self.frameSize * 1000 // self.frequency
+
+    def close(self):
+        self.raw.release()
+        self.raw = None
+        self.sound = None
+
+
+# one song being decoded, with a bounded buffer of decoded audio ahead of what's been played
+class Track:
+    def __init__(self, decoder, path, tag, startMs, frequency, frameSize):
+        self.decoder = decoder
+        self.path = path
+        self.tag = tag
+        self.frequency = frequency
+        self.frameSize = frameSize
+        self.buffer = bytearray()
+        self.ended = False
+        # frames taken out of the buffer so far, counting from startMs
+        self.frames = 0
+        self.startMs = startMs
+
+    def positionMs(self):
+        return self.startMs + self.frames * 1000 // self.frequency
+
+    def buffered(self):
+        return len(self.buffer) // self.frameSize
+
+    # decodes until at least the given number of frames are buffered (or the song runs out)
+    def fill(self, frames):
+        while(not self.ended and len(self.buffer) < frames * self.frameSize):
+            chunk = self.decoder.read(frames * self.frameSize - len(self.buffer))
+            if(not chunk):
+                self.ended = True
+            self.buffer += chunk
+
+    # moves within the song, if the decoder can do that without opening it again
+    def seek(self, ms):
+        if(not hasattr(self.decoder, "seek")):
+            return False
+        self.decoder.seek(ms)
+        self.buffer.clear()
+        self.ended = False
+        self.frames = 0
+        self.startMs = ms
+        return True
+
+    def read(self, frames):
+        self.fill(frames)
+        size = min(len(self.buffer), frames * self.frameSize)
+        size -= size % self.frameSize
+        chunk = bytes(self.buffer[:size])
+        del self.buffer[:size]
+        self.frames += size // self.frameSize
+        return chunk
+
+    def close(self):
+        self.decoder.close()
+
+
+# plays songs through one reserved pygame channel, fed with short chunks by a background thread
+#
+# a little before a song ends, nextTrack() is asked for the (path, tag) to play after it (or None),
+# and the two are crossfaded over the last overlapMs of the song
+# onTrackChanged(tag) is called when a fade starts, and onEnd() when a song runs out with nothing after it
+#
+# with ffmpeg, only about decodeAheadMs (plus the overlap) of each song is held in memory at once
+# (without it, whole songs are, up to SoundDecoder.maxDecodeMs);
+# crossfading needs numpy, and without it songs are just played back to back
+#
+# the next song is asked for and opened on a queue of its own, so the current one goes on being fed in the meantime
+class MixingEngine(AudioBackend):
+    def __init__(self, nextTrack, onTrackChanged, onEnd, overlapMs=0, chunkMs=100, decodeAheadMs=1000):
+        super().__init__(nextTrack, onTrackChanged, onEnd)
+
+        # the mixer is assumed to be running 16 bit samples
+        if(not mixer.get_init()):
+            mixer.init()
+        self.frequency, _, self.channels = mixer.get_init()
+        self.frameSize = 2 * self.channels
+        self.chunkMs = chunkMs
+        self.chunkFrames = self.frequency * chunkMs // 1000
+        self.decodeAheadFrames = self.frequency * decodeAheadMs // 1000
+        self.setOverlap(overlapMs)
+        self.decoderType = FfmpegDecoder if shutil.which("ffmpeg") else SoundDecoder
+        if(self.decoderType is SoundDecoder):
+            print(f"ffmpeg isn't available, so songs are decoded whole, and ones over {SoundDecoder.maxDecodeMs // 60000} minutes can't be played")
+
+        mixer.set_reserved(1)
+        self.channel = mixer.Channel(0)
+
+        self.lock = threading.Lock()
+        self.current: Track = None
+        self.next: Track = None
+        self.fading: Track = None
+        self.fadeFrames = 0
+        self.wantsNext = False
+        # bumped whenever the next song is thrown away, so an opening still under way is dropped too
+        self.nextGeneration = 0
+        self.opener = CommandQueue()
+        self.paused = False
+
+        # (start time, tag, song position in ms) of the chunks handed to the channel, for getPos
+        self.played = collections.deque(maxlen=8)
+        self.playingUntil = 0
+        self.pausedAt = None
+
+        self.running = True
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def setOverlap(self, overlapMs):
+        self.overlapFrames = self.frequency * overlapMs // 1000 if numpy is not None else 0
+
+    def openTrack(self, path, tag, startMs=0):
+        decoder = self.decoderType(path, startMs, self.frequency, self.channels)
+        return Track(decoder, path, tag, startMs, self.frequency, self.frameSize)
+
+    # cuts straight to the given song
+    def play(self, path, tag=None, startMs=0):
+        track = self.openTrack(path, tag, startMs)
+        with self.lock:
+            self._replaceCurrent(track)
+
+    def seek(self, ms):
+        with self.lock:
+            if(not self.current):
+                return
+            if(self.current.seek(ms)):
+                self._replaceCurrent(self.current)
+                return
+            path, tag = self.current.path, self.current.tag
+        track = self.openTrack(path, tag, ms)
+        with self.lock:
+            self._replaceCurrent(track)
+
+    def stop(self):
+        with self.lock:
+            self._replaceCurrent(None)
+
+    def pause(self):
+        with self.lock:
+            if(not self.paused):
+                self.paused = True
+                self.pausedAt = time.monotonic()
+                self.channel.pause()
+
+    def unpause(self):
+        with self.lock:
+            if(self.paused):
+                self.paused = False
+                # everything handed to the channel was held up for as long as it was paused
+                pauseTime = time.monotonic() - self.pausedAt
+                self.played = collections.deque(((start + pauseTime, tag, pos) for start, tag, pos in self.played), maxlen=8)
+                self.playingUntil += pauseTime
+                self.pausedAt = None
+                self.channel.unpause()
+
+    def setVolume(self, volume):
+        self.channel.set_volume(volume)
+
+    # position (in ms) within the song that's audible right now
+    # (it stands still while paused, and once the channel runs out of what it's been handed)
+    def getPos(self):
+        with self.lock:
+            now = self.pausedAt or time.monotonic()
+            if(self.playingUntil):
+                now = min(now, self.playingUntil)
+            for start, tag, pos in reversed(self.played):
+                if(start <= now):
+                    return pos + int((now - start) * 1000)
+            return self.played[0][2] if self.played else 0
+
+    def getLength(self):
+        with self.lock:
+            return self.current.decoder.lengthMs() if self.current else -1
+
+    # stops the feeder and the opener, then lets go of the songs
+    # (an opening that's under way may be waiting on the player, which may be who's closing us,
+    # so the opener isn't waited for; whatever it opens is thrown away, as stop moves nextGeneration on)
+    def close(self):
+        self.running = False
+        self.thread.join()
+        self.opener.close(wait=False)
+        self.stop()
+
+    def dropNext(self):
+        with self.lock:
+            if(self.next):
+                self.next.close()
+            self.next = None
+            self.wantsNext = False
+            self.nextGeneration += 1
+
+    def _replaceCurrent(self, track):
+        for old in (self.current, self.fading, self.next):
+            if(old and old is not track):
+                old.close()
+        self.current = track
+        self.fading = None
+        self.next = None
+        self.wantsNext = False
+        self.nextGeneration += 1
+        self.channel.stop()
+        self.played.clear()
+        self.playingUntil = 0
+        if(track):
+            self.played.append((time.monotonic(), track.tag, track.startMs))
+
+    def _run(self):
+        while(self.running):
+            if(self.paused or self.channel.get_queue() is not None):
+                time.sleep(self.chunkMs / 4000)
+                continue
+
+            events = list()
+            with self.lock:
+                chunk = self._nextChunk(events)
+                if(chunk):
+                    self._queueChunk(chunk)
+            for event in events:
+                try:
+                    event()
+                except BaseException as excep:
+                    print(excep)
+            if(not chunk and not events):
+                time.sleep(self.chunkMs / 4000)
+
+    # asks for the song to play next and opens it (on the opener's queue, outside the lock,
+    # since nextTrack belongs to the player and starting a decoder can take a while)
+    def _openNext(self, generation):
+        try:
+            upcoming = self.nextTrack()
+            track = self.openTrack(*upcoming) if upcoming else None
+        except BaseException as excep:
+            print(excep)
+            track = None
+        with self.lock:
+            if(generation == self.nextGeneration and self.wantsNext):
+                self.wantsNext = False
+                # (False if there's nothing to play after this one: the end comes as it is)
+                self.next = track or False
+                return
+        if(track):
+            track.close()
+
+    def _nextChunk(self, events):
+        current = self.current
+        if(not current):
+            return None
+
+        # keep enough decoded to see the end coming before the fade has to start
+        current.fill(self.overlapFrames + self.decodeAheadFrames)
+        if(current.ended and self.next is None and not self.wantsNext):
+            self.wantsNext = True
+            self.opener.put(lambda generation=self.nextGeneration: self._openNext(generation))
+
+        if(not self.fading and self.next and self.overlapFrames and current.ended
+                and 0 < current.buffered() <= self.overlapFrames):
+            self.fading = current
+            self.fadeFrames = current.buffered()
+            self.current = current = self.next
+            self.next = None
+            events.append(lambda tag=current.tag: self.onTrackChanged(tag))
+
+        if(self.fading):
+            return self._fadeChunk()
+
+        tag, pos = current.tag, current.positionMs()
+        chunk = current.read(self.chunkFrames)
+        if(chunk):
+            self.played.append((max(time.monotonic(), self.playingUntil), tag, pos))
+            return chunk
+
+        # the song's done: go straight on to the next one (if there is one)
+        if(self.wantsNext):
+            # still waiting on nextTrack
+            return None
+        current.close()
+        self.current = self.next or None
+        self.next = None
+        if(self.current):
+            events.append(lambda tag=self.current.tag: self.onTrackChanged(tag))
+            return self._nextChunk(events)
+        events.append(self.onEnd)
+        return None
+
+    # mixes the end of the fading song with the start of the current one
+    def _fadeChunk(self):
+        fading, current = self.fading, self.current
+        done = self.fadeFrames - fading.buffered()
+        tag, pos = current.tag, current.positionMs()
+        outgoing = fading.read(self.chunkFrames)
+        frames = len(outgoing) // self.frameSize
+        incoming = current.read(frames)
+
+        # equal power crossfade, so the loudness doesn't dip in the middle
+        progress = (numpy.arange(done, done + frames, dtype=numpy.float32) / max(1, self.fadeFrames))[:, None]
+        outSamples = numpy.frombuffer(outgoing, dtype=numpy.int16).reshape(-1, self.channels)
+        inSamples = numpy.zeros_like(outSamples)
+        inSamples.flat[:len(incoming) // 2] = numpy.frombuffer(incoming, dtype=numpy.int16)
+        mixed = outSamples * numpy.cos(progress * numpy.pi / 2) + inSamples * numpy.sin(progress * numpy.pi / 2)
+
+        if(fading.buffered() == 0):
+            fading.close()
+            self.fading = None
+        self.played.append((max(time.monotonic(), self.playingUntil), tag, pos))
+        return numpy.clip(mixed, -32768, 32767).astype(numpy.int16).tobytes()
+
+    def _queueChunk(self, chunk):
+        sound = mixer.Sound(buffer=chunk)
+        start = max(time.monotonic(), self.playingUntil)
+        self.playingUntil = start + len(chunk) / self.frameSize / self.frequency
+        if(self.channel.get_busy()):
+            self.channel.queue(sound)
+        else:
+            self.channel.play(sound)
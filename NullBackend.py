@@ -0,0 +1,133 @@
+import threading
+import time
+
+from AudioBackend import AudioBackend
+
+
+# plays nothing: a song is just a clock counting up to its length, for running radium without any audio
+#
+# a song is lengthOf(tag) ms long (or defaultLengthMs, if that's not known), and when the clock gets there,
+# the next song is asked for and taken over like with any other backend
+# the clock is moved along by advance(), or, given a speed, by a thread of its own at speed times real time
+class NullBackend(AudioBackend):
+    def __init__(self, nextTrack, onTrackChanged, onEnd, speed=0, defaultLengthMs=180000, lengthOf=None, tickMs=50):
+        super().__init__(nextTrack, onTrackChanged, onEnd)
+        self.speed = speed
+        self.defaultLengthMs = defaultLengthMs
+        self.lengthOf = lengthOf
+        self.tickMs = tickMs
+
+        self.lock = threading.Lock()
+        # (path, tag) of the current song
+        self.current = None
+        self.length = -1
+        self.pos = 0
+        self.paused = False
+        self.volume = 1
+        # bumped whenever the current song is cut to something else, so a song ending at the same time is ignored
+        self.generation = 0
+        # songs started so far (for benchmarks)
+        self.songsPlayed = 0
+
+        self.running = True
+        self.thread = None
+        if(speed > 0):
+            self.thread = threading.Thread(target=self._run, daemon=True)
+            self.thread.start()
+
+    def getTrackLength(self, tag):
+        length = -1
+        if(self.lengthOf):
+            try:
+                length = self.lengthOf(tag)
+            except BaseException as excep:
+                print(excep)
+        # (a song always takes some time, so a clock moving along always gets somewhere)
+        return length if length and length > 0 else max(1, self.defaultLengthMs)
+
+    def play(self, path, tag=None, startMs=0):
+        length = self.getTrackLength(tag)
+        with self.lock:
+            self._replaceCurrent((path, tag), length, startMs)
+
+    def seek(self, ms):
+        with self.lock:
+            if(self.current):
+                self.pos = max(0, min(self.length, ms))
+
+    def stop(self):
+        with self.lock:
+            self._replaceCurrent(None, -1, 0)
+
+    def pause(self):
+        with self.lock:
+            self.paused = True
+
+    def unpause(self):
+        with self.lock:
+            self.paused = False
+
+    def setVolume(self, volume):
+        self.volume = volume
+
+    def getPos(self):
+        with self.lock:
+            return int(self.pos)
+
+    def getLength(self):
+        with self.lock:
+            return self.length
+
+    def close(self):
+        self.running = False
+        self.stop()
+
+    def _replaceCurrent(self, track, length, startMs):
+        self.generation += 1
+        self.current = track
+        self.length = length
+        self.pos = max(0, min(length, startMs)) if track else 0
+        if(track):
+            self.songsPlayed += 1
+
+    # moves the clock ms along (unless it's paused), going on through as many songs as that takes
+    def advance(self, ms):
+        while(ms > 0):
+            with self.lock:
+                if(self.paused or not self.current):
+                    return
+                step = min(ms, self.length - self.pos)
+                self.pos += step
+                ms -= step
+                if(self.pos < self.length):
+                    return
+                generation = self.generation
+
+            # the song's done: ask for the next one (outside the lock, since nextTrack belongs to the player)
+            try:
+                upcoming = self.nextTrack()
+                length = self.getTrackLength(upcoming[1]) if upcoming else -1
+            except BaseException as excep:
+                print(excep)
+                upcoming, length = None, -1
+            with self.lock:
+                # the player cut to another song in the meantime
+                if(generation != self.generation):
+                    return
+                self._replaceCurrent(upcoming, length, 0)
+
+            try:
+                if(upcoming):
+                    self.onTrackChanged(upcoming[1])
+                else:
+                    self.onEnd()
+            except BaseException as excep:
+                print(excep)
+
+    def _run(self):
+        last = time.monotonic()
+        while(self.running):
+            time.sleep(self.tickMs / 1000)
+            now = time.monotonic()
+            self.advance((now - last) * 1000 * self.speed)
+            last = now
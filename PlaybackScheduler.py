@@ -0,0 +1,172 @@
+import heapq
+import random
+
+# picks what autoplay plays next out of a pool of songs (an IndexedSet: the active songs, or the whole library)
+# next(pool) makes a pick, played(song) is told about every song that starts playing,
+# and describe() is a line for the status icon
+#
+# the pool can change between picks; the schedulers that build something from it rebuild it when it does
+
+
+# every song equally likely, every time
+class RandomScheduler:
+    name = "random"
+
+    def next(self, pool):
+        return pool.choice()
+
+    def played(self, song):
+        pass
+
+    def describe(self):
+        return "Order: Random"
+
+
+# every song in the pool plays once (in a random order) before any song plays again
+class ShuffleScheduler:
+    name = "shuffle"
+
+    def __init__(self):
+        self.bag = list()
+        self.roundPlayed = set()
+
+    def next(self, pool):
+        if(not pool):
+            raise IndexError("empty pool")
+        while True:
+            # songs that left the pool (or were played some other way) since the bag was filled are skipped
+            while(self.bag):
+                song = self.bag.pop()
+                if(song in pool and song not in self.roundPlayed):
+                    return song
+
+            # refill with whatever hasn't had its turn yet (including songs that joined the pool mid-round)
+            self.bag = [song for song in pool if song not in self.roundPlayed]
+            if(not self.bag):
+                self.roundPlayed.clear()
+                self.bag = list(pool)
+            random.shuffle(self.bag)
+
+    def played(self, song):
+        self.roundPlayed.add(song)
+
+    def describe(self):
+        return f"Order: Shuffle ({len(self.bag)} left)"
+
+
+# songs that have been played less are more likely: a song played n times has weight 1 / (n + 1)
+# the weights sit in a fenwick tree over the pool's positions, so picks and updates are O(log n)
+class WeightedScheduler:
+    name = "weighted"
+
+    def __init__(self):
+        self.playCounts = dict()
+        self.pool = None
+        self.poolVersion = None
+        self.tree = list()
+        self.weights = list()
+
+    def weight(self, song):
+        return 1 / (1 + self.playCounts.get(song, 0))
+
+    def sync(self, pool):
+        if(pool is self.pool and pool.version == self.poolVersion):
+            return
+        self.pool = pool
+        self.poolVersion = pool.version
+        self.weights = [self.weight(song) for song in pool.items]
+        # builds the tree in O(n)
+        self.tree = [0] + self.weights
+        for i in range(1, len(self.tree)):
+            parent = i + (i & -i)
+            if(parent < len(self.tree)):
+                self.tree[parent] += self.tree[i]
+
+    def total(self):
+        i = len(self.tree) - 1
+        total = 0
+        while(i > 0):
+            total += self.tree[i]
+            i -= i & -i
+        return total
+
+    def next(self, pool):
+        if(not pool):
+            raise IndexError("empty pool")
+        self.sync(pool)
+
+        # walks down the tree to the position where the running total passes target
+        target = random.random() * self.total()
+        pos = 0
+        step = 1 << (len(self.tree) - 1).bit_length()
+        while(step):
+            if(pos + step < len(self.tree) and self.tree[pos + step] <= target):
+                pos += step
+                target -= self.tree[pos]
+            step >>= 1
+        return pool.items[min(pos, len(pool.items) - 1)]
+
+    def played(self, song):
+        self.playCounts[song] = self.playCounts.get(song, 0) + 1
+        if(self.pool is None or self.pool.version != self.poolVersion or song not in self.pool):
+            return
+        i = self.pool.positions[song]
+        delta = self.weight(song) - self.weights[i]
+        self.weights[i] += delta
+        i += 1
+        while(i < len(self.tree)):
+            self.tree[i] += delta
+            i += i & -i
+
+    def describe(self):
+        return "Order: Weighted by Play Count"
+
+
+# the song in the pool that was played longest ago (never played counts as longest ago, ties are random)
+# kept in a heap of (last played, tiebreak, song); entries made stale by a newer play are dropped as they surface
+class LeastRecentScheduler:
+    name = "least recent"
+
+    def __init__(self):
+        self.lastPlayed = dict()
+        self.clock = 0
+        self.pool = None
+        self.poolVersion = None
+        self.heap = list()
+
+    def sync(self, pool):
+        if(pool is self.pool and pool.version == self.poolVersion):
+            return
+        self.pool = pool
+        self.poolVersion = pool.version
+        self.heap = [(self.lastPlayed.get(song, 0), random.random(), song) for song in pool.items]
+        heapq.heapify(self.heap)
+
+    # the pick stays on the heap until it's played, so asking again gives the same song
+    def next(self, pool):
+        if(not pool):
+            raise IndexError("empty pool")
+        self.sync(pool)
+        while(self.heap[0][0] != self.lastPlayed.get(self.heap[0][2], 0)):
+            heapq.heappop(self.heap)
+        return self.heap[0][2]
+
+    def played(self, song):
+        self.clock += 1
+        self.lastPlayed[song] = self.clock
+        if(self.pool is not None and self.pool.version == self.poolVersion and song in self.pool):
+            heapq.heappush(self.heap, (self.clock, random.random(), song))
+
+    def describe(self):
+        return "Order: Least Recently Played"
+
+
+schedulers = {scheduler.name: scheduler for scheduler in (
+    RandomScheduler, ShuffleScheduler, WeightedScheduler, LeastRecentScheduler)}
+
+
+def makeScheduler(name):
+    if(name not in schedulers):
+        print(f"unknown autoplay order \"{name}\", using random")
+        name = "random"
+    return schedulers[name]()
@@ -0,0 +1,48 @@
+import time
+
+
+# the position (in ms) within the current song, kept on the monotonic clock rather than asked of the player:
+# it's set when a song starts or is sought, runs while the song plays and stands still while it's paused
+#
+# what the player reports can be used to correct it, but not right after it was set
+# (a player takes a moment to catch up with a seek, and reports the old position until it has)
+class PositionClock:
+    def __init__(self, driftMs=500, settleMs=1000):
+        self.driftMs = driftMs
+        self.settleMs = settleMs
+        self.baseMs = 0
+        # when the clock started running from baseMs (None while it's stopped), and when it was last set
+        self.runningSince = None
+        self.setAt = 0
+
+    def running(self):
+        return self.runningSince is not None
+
+    def set(self, ms):
+        now = time.monotonic()
+        self.baseMs = ms
+        self.setAt = now
+        if(self.running()):
+            self.runningSince = now
+
+    def start(self):
+        if(not self.running()):
+            self.runningSince = time.monotonic()
+
+    def stop(self):
+        if(self.running()):
+            self.baseMs = self.pos()
+            self.runningSince = None
+
+    def pos(self):
+        if(not self.running()):
+            return int(self.baseMs)
+        return int(self.baseMs + (time.monotonic() - self.runningSince) * 1000)
+
+    # takes the player's position over the clock's if the two have drifted apart (say, after the player stalled)
+    # players will often wrongly report 0, and will pretty much never correctly report 0, so 0 is ignored
+    def correct(self, ms):
+        if(ms <= 0 or (time.monotonic() - self.setAt) * 1000 < self.settleMs):
+            return
+        if(abs(ms - self.pos()) > self.driftMs):
+            self.set(ms)
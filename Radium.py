@@ -3,19 +3,56 @@ import random
 import threading
 import time
 import re
-from collections import namedtuple
-from typing import List, Tuple
-
-import keyboard
-import osascript
-import vlc
-
-from RadiumStatusIcon import RadiumStatusIcon
-from StringSearch import makeSearchable, searchableChars, stringSearch
-
-Folder = namedtuple("Folder", ["name", "searchableName", "subFolders", "songs", "macros"])
+from collections import deque, namedtuple
+from typing import Deque, Dict, List, Tuple
+
+try:
+    import keyboard
+except ImportError:
+    # (without it, nothing hooks the keyboard, and radium can only be driven from its status icon)
+    keyboard = None
+
+try:
+    import osascript
+except ImportError:
+    # (it shows the search dialog and alerts, which need macos)
+    osascript = None
+
+from AudioBackend import AudioBackend
+from CommandQueue import CommandQueue, LatencyLog, MergedCommand
+from LibraryCache import LibraryCache
+from LibraryWatcher import LibraryWatcher
+from HistoryLog import HistoryLog
+from IndexedSet import IndexedSet
+from MetadataCache import MetadataCache, TagIndex
+from NullBackend import NullBackend
+from PlaybackScheduler import makeScheduler
+from SongTable import SongTable
+from StringSearch import SearchIndex, makeSearchable, stringSearch
+
+try:
+    from VlcBackend import VlcBackend
+except ImportError:
+    VlcBackend = None
+
+try:
+    from MixingEngine import MixingEngine
+except ImportError:
+    MixingEngine = None
+
+try:
+    from RadiumStatusIcon import RadiumStatusIcon
+except ImportError:
+    # (the status icon needs macos; without it, radium runs with nothing to show)
+    RadiumStatusIcon = None
+
+Folder = namedtuple("Folder", ["name", "searchableName", "localPath", "subFolders", "songs", "macros"])
 Macro = namedtuple("Macro", ["name", "searchableName", "localPath"])
-Song = namedtuple("Song", ["name", "searchableName", "localPath"])
+# a macro's contents with every macro call in them expanded, the number of calls that took,
+# and the mtime of every macro file that went into it (local path -> mtime)
+CompiledMacro = namedtuple("CompiledMacro", ["text", "calls", "files"])
+
+macroCallPattern = re.compile(r">([a-z \/]+)")
 
 
 def msToStr(ms):
@@ -41,17 +78,60 @@ class Radium:
         self.maxHistoryStackSize: int = 30
         self.folderSearchLimit = 5
         self.macroCallLimit = 10
+        self.libraryCachePath = "./library.cache"
+        self.watchLibrary = False
+        self.libraryScanWorkers = 8
+        self.historyPath = "./history.log"
+        self.autoplayOrder = "random"
+        self.metadataCachePath = "./metadata.cache"
+        self.metadataProbeWorkers = 4
+        # "vlc", "pygame" (which can crossfade), or "null" to play nothing (at nullBackendSpeed times real time)
+        self.audioBackend = "vlc"
+        self.crossfadeMs = 0
+        self.nullBackendSpeed = 1
 
         self.folders: List[Folder] = list()
         self.macros: List[Macro] = list()
-        self.songs: List[Song] = list()
-
-        self.activeSongs: Set[Song] = set()
-        self.songQueue: List[Song] = list()
-        self.historyStack: List[Tuple(Song, int)] = list()
-
-        self.vlcInst = None
-        self.player = None
+        # songs are ids into songTable
+        self.songTable: SongTable = SongTable()
+        self.songs: List[int] = list()
+        self.songIndex: SearchIndex = None
+        self.macroIndex: SearchIndex = None
+        self.folderIndex: SearchIndex = None
+        self.folderPaths: Dict[str, Folder] = dict()
+
+        # every folder's songs and macros (subfolders included) are one contiguous slice of these
+        self.songsByFolder: List[int] = list()
+        self.macrosByFolder: List[Macro] = list()
+        # folder local path -> (songs start, songs end, macros start, macros end)
+        self.folderSpans: Dict[str, Tuple[int, int, int, int]] = dict()
+
+        self.libraryCache: LibraryCache = None
+        self.libraryWatcher: LibraryWatcher = None
+        self.metadataCache: MetadataCache = None
+        # rebuilt for the first tag search after the library layout changes, or after the metadata changes
+        # (once the background probes are done; until then, tag searches use the index from before them)
+        self.tagIndex: TagIndex = None
+        self.tagIndexChanges = None
+        # macro call term -> Macro (or None), and macro local path -> CompiledMacro
+        self.macroLookups: Dict[str, Macro] = dict()
+        self.compiledMacros: Dict[str, CompiledMacro] = dict()
+        # songs and macros removed by a batch of library changes, and the folders they were in,
+        # so every list holding them is filtered once per batch rather than once per item
+        self.removedSongs = set()
+        self.removedMacros = set()
+        self.removedPaths = set()
+        self.removedFrom: Dict[str, Folder] = dict()
+
+        self.activeSongs: IndexedSet = IndexedSet()
+        # every song in the library, for autoplay to pick from when no songs are active
+        self.librarySongs: IndexedSet = IndexedSet()
+        self.scheduler = makeScheduler(self.autoplayOrder)
+        self.songQueue: Deque[int] = deque()
+        self.historyStack: HistoryLog = HistoryLog(None, self.maxHistoryStackSize)
+
+        self.backend: AudioBackend = None
+        self.backendName = None
         self.statusIcon = None
 
         self.loopingActive = False
@@ -59,54 +139,82 @@ class Radium:
         self.volume = 100
         self.playing = False
         self.currentSong = None
-        self.currentTime = 1
+        self.currentSongLength = -1
+        # whether the current song has run out (with nothing to follow it)
+        self.songEnded = False
+        # the scheduler's pick for what autoplay plays next, kept until it's played so peeking at it is stable
+        self.nextPick = None
+        # whether the backend has asked what follows the current song, and what it was given
+        self.nextAsked = False
+        self.nextOffered = None
         
-        self.songStartThread = None
         self.prevKeyHook = None
+        # everything that changes the player's state (key presses, backend events, searches, library changes)
+        # runs here, one at a time, so none of it needs locking against the rest
+        self.commands = CommandQueue()
+        # time spent in the key hook, per key event
+        self.hookLatency = LatencyLog()
 
         self.queuedStatusIconTasks = list()
         self.statusIconQueueLock = threading.Lock()
         self.statusIconQueueThread = None
 
     def onSongChanged(self):
-        self.setButtonTitle("song", f"Playing: \"{self.currentSong.name}\"")
+        self.setButtonTitle("song", f"Playing: \"{self.songTable.name(self.currentSong)}\"")
+
+    # (the song starts startMs in, and only once playing, if it's paused)
+    def setSong(self, song, addToHistory=True, startMs=0):
+        self.changeSong(song, addToHistory)
 
-    def onTimeChanged(self):
-        # player.get_time() will often wrongly be 0, 
-        # and will pretty much never correctly be 0
-        # so, if it's 0, just use the previous time instead
-        self.currentTime = self.player.get_time() or self.currentTime
+        path = os.path.join(self.audioDirectory, self.songTable.localPath(song))
+        self.backend.play(path, song, startMs)
 
-    def onLengthChanged(self):
-        self.currentSongLength = self.player.get_length()
-        self.setButtonTitle("songLength", f"Length: {msToStr(self.currentSongLength)}")
+    def changeSong(self, song, addToHistory=True):
+        # whatever the backend had lined up for after the old song is gone with it
+        self.nextAsked = False
+        if(song == self.nextPick):
+            self.nextPick = None
 
-    def setSong(self, song, addToHistory=True):
         # add existing song to history stack
         if(self.currentSong):
-            if(addToHistory and (len(self.historyStack) == 0 or self.historyStack[-1][0] != song)):
-                prevTime = self.currentTime
-                if(prevTime < 5000 or prevTime > self.currentSongLength - 5000):
+            if(addToHistory and (len(self.historyStack) == 0 or self.historyStack.last()[0] != self.songTable.localPath(song))):
+                prevTime = self.getTime()
+                # (the end is only checked if the song's length is known)
+                length = self.getCurrentSongLength()
+                if(prevTime < 5000 or (length > 0 and prevTime > length - 5000)):
                     prevTime = 1
 
-                self.historyStack.append((self.currentSong, prevTime))
+                # (the oldest entry falls off on its own once the history is full)
+                self.historyStack.push(self.songTable.localPath(self.currentSong), prevTime)
 
-            if(len(self.historyStack) >= self.maxHistoryStackSize):
-                self.historyStack.pop(0)
-        
-        
-        self.setupVLC()
-
-        self.currentTime = 1
         self.currentSong = song
+        self.songEnded = False
+        self.scheduler.played(song)
+        self.schedulerUpdated()
         self.currentSongUpdated()
-
-        path = os.path.join(self.audioDirectory, song.localPath)
-        self.player.set_media(self.vlcInst.media_new_path(path))
+        self.onSongChanged()
+
+        # known before the backend has even opened the song (and asked of the backend later, if not)
+        self.currentSongLength = self.getSongLength(song)
+        if(self.currentSongLength > 0):
+            self.setButtonTitle("songLength", f"Length: {msToStr(self.currentSongLength)}")
+
+    # the song's length in ms, or -1 if it can't be read
+    def getSongLength(self, song):
+        metadata = self.metadataCache.require(self.songTable.localPath(song))
+        return metadata.length if metadata else -1
+
+    # the current song's length, from its metadata, or from the backend once it's opened the song
+    def getCurrentSongLength(self):
+        if(self.currentSongLength <= 0 and self.currentSong):
+            self.currentSongLength = self.backend.getLength()
+            if(self.currentSongLength > 0):
+                self.setButtonTitle("songLength", f"Length: {msToStr(self.currentSongLength)}")
+        return self.currentSongLength
     
     def currentSongUpdated(self):
-        self.setButtonTitle("song", f"----")
-        self.setButtonTitle("songLength", f"----")
+        self.setButtonTitle("song", "----")
+        self.setButtonTitle("songLength", "----")
 
     def doSearch(self):
         # self._handleSearch()
@@ -115,79 +223,160 @@ class Radium:
                 target=self._handleSearch, daemon=True)
             self.searchThread.start()
 
+    # the dialog waits on the user, so it gets its own thread; what was entered is handled on the command queue
     def _handleSearch(self):
         result = self.openSearchScript()
         self.searchThread = None
         if(result):
-            self.processSearchEntry(result)
+            self.commands.put(lambda : self.processSearchEntry(result))
 
+    # finds the folder matching the path parts, starting from the subfolders of root
+    # (the omnifolder's subfolders are every folder in the library)
     def searchFolders(self, parts, root):
-        subFolderSNs = [sub.searchableName for sub in root.subFolders]
+        if(not parts):
+            return root
+
         # if only 1 term, find the corresponding folder
+        limit = 1 if len(parts) == 1 else self.folderSearchLimit
+        if(root is self.omnifolder):
+            candidates = [self.folderIndex.items[i] for i in self.folderIndex.search(parts[0], limit)]
+        else:
+            subFolderSNs = [sub.searchableName for sub in root.subFolders]
+            candidates = [root.subFolders[i] for i in stringSearch(parts[0], subFolderSNs, limit)]
+
         if(len(parts) == 1):
-            founds = stringSearch(parts[0], subFolderSNs, 1)
-            if(founds):
-                return self.folders[founds[0]]
-            return None
+            return candidates[0] if candidates else None
 
-        founds = stringSearch(parts[0], subFolderSNs, self.folderSearchLimit)
-        for candidateFolderIndex in founds:
-            result = self.searchFolders(
-                parts[1:], self.folders[candidateFolderIndex])
+        for candidate in candidates:
+            result = self.searchFolders(parts[1:], candidate)
             if(result):
                 return result
         return None
 
+    def getSongByPath(self, localPath):
+        folder = self.folderPaths.get(os.path.dirname(localPath) or ".")
+        if(folder is None):
+            return None
+        return next((song for song in folder.songs if self.songTable.localPath(song) == localPath), None)
+
+    def getParentFolder(self, folder):
+        if(folder.localPath == "."):
+            return None
+        return self.folderPaths.get(os.path.dirname(folder.localPath) or ".")
+
     def getAllSongsInFolder(self, folder):
-        songs = list()
-        songs.extend(folder.songs)
-        for sub in folder.subFolders:
-            songs.extend(self.getAllSongsInFolder(sub))
-        return songs
+        if(folder is self.omnifolder):
+            return list(self.songs)
+        start, end, _, _ = self.folderSpans[folder.localPath]
+        return self.songsByFolder[start:end]
 
     def getAllMacrosInFolder(self, folder):
-        macros = list()
-        macros.extend(folder.macros)
+        if(folder is self.omnifolder):
+            return list(self.macros)
+        _, _, start, end = self.folderSpans[folder.localPath]
+        return self.macrosByFolder[start:end]
+
+    # lays the folder tree out depth first, so that every folder's songs and macros
+    # (and its subfolders') end up next to each other in songsByFolder and macrosByFolder
+    def updateFolderSpans(self):
+        self.songsByFolder = list()
+        self.macrosByFolder = list()
+        self.folderSpans = dict()
+        self.tagIndex = None
+        # macro calls can find other macros once the layout changes
+        self.macroLookups.clear()
+        self.compiledMacros.clear()
+        root = self.folderPaths.get(".")
+        if(root):
+            self._updateFolderSpans(root)
+
+    def _updateFolderSpans(self, folder):
+        songStart = len(self.songsByFolder)
+        macroStart = len(self.macrosByFolder)
+        self.songsByFolder.extend(folder.songs)
+        self.macrosByFolder.extend(folder.macros)
         for sub in folder.subFolders:
-            macros.extend(self.getAllMacrosInFolder(sub))
-        return macros
+            self._updateFolderSpans(sub)
+        self.folderSpans[folder.localPath] = (songStart, len(self.songsByFolder), macroStart, len(self.macrosByFolder))
 
+    # replaces every macro call in entry with the macro's (fully expanded) contents,
+    # or returns None if a macro can't be found or it takes more than macroCallLimit calls
     def resolveMacros(self, entry):
-        macroCount = 0
+        expanded = self.expandMacros(entry, set())
+        return expanded.text if expanded else None
+
+    # entry with its macro calls expanded, as a CompiledMacro, or None if that didn't work
+    # compiling holds the local paths of the macros being compiled further up, since a macro can't call itself
+    def expandMacros(self, entry, compiling):
+        calls = 0
+        files = dict()
         while True:
-            if(macroCount > self.macroCallLimit):
-                return None
-
-            found = re.search(r">([a-z \/]+)", entry)
+            found = macroCallPattern.search(entry)
             if(not found):
-                break
-            macroCount += 1
+                return CompiledMacro(text=entry, calls=calls, files=files)
 
-            macroPool = self.macros
-            
-            term = found.group(1).strip().lower()
-            pathParts = list(filter(len, term.split("/")))
-            
-            # macro has no folder mode: pretend that trailing /'s aren't there
-            if(len(pathParts) > 1):
-                folder = self.searchFolders(pathParts[:-1], self.omnifolder)
-                if(folder):
-                    macroPool = self.getAllMacrosInFolder(folder)
-                else:
-                    return None
-            
-            macroPool.sort(key=lambda mac : len(mac.searchableName))
-            folderMacroSNs = list(mac.searchableName for mac in macroPool)
-            foundIndices = stringSearch(pathParts[-1], folderMacroSNs, 1)
-            if(len(foundIndices) == 0):
+            macro = self.findMacro(found.group(1))
+            if(macro is None or macro.localPath in compiling):
+                return None
+            compiled = self.compileMacro(macro, compiling)
+            if(compiled is None):
                 return None
 
-            macroContents = self.readMacroFile(self.macros[foundIndices[0]].localPath)
-            if(macroContents == None):
+            calls += 1 + compiled.calls
+            if(calls > self.macroCallLimit):
                 return None
+            files.update(compiled.files)
+            entry = entry[:found.start()] + compiled.text + entry[found.end():]
 
-            entry = entry[:found.start()] + macroContents + entry[found.end():]
-        return entry
+    # the macro the call term refers to, or None
+    def findMacro(self, term):
+        if(term in self.macroLookups):
+            return self.macroLookups[term]
+
+        pathParts = list(filter(len, term.strip().lower().split("/")))
+        if(not pathParts):
+            return None
+        # macro has no folder mode: pretend that trailing /'s aren't there
+        if(len(pathParts) > 1):
+            folder = self.searchFolders(pathParts[:-1], self.omnifolder)
+            if(not folder):
+                return None
+            _, _, start, end = self.folderSpans[folder.localPath]
+            foundIndex = next(self.macroIndex.search(pathParts[-1], 1, start, end), None)
+        else:
+            foundIndex = next(self.macroIndex.search(pathParts[-1], 1), None)
+
+        macro = self.macroIndex.items[foundIndex] if foundIndex is not None else None
+        self.macroLookups[term] = macro
+        return macro
+
+    # the macro's contents with its own calls expanded, read from its file only when the file
+    # (or the file of a macro it calls) has changed since it was last compiled
+    def compileMacro(self, macro, compiling):
+        compiled = self.compiledMacros.get(macro.localPath)
+        if(compiled and all(self.getMacroMtime(path) == mtime for path, mtime in compiled.files.items())):
+            return compiled
+
+        mtime = self.getMacroMtime(macro.localPath)
+        contents = self.readMacroFile(macro.localPath)
+        if(contents is None):
+            return None
+
+        compiling.add(macro.localPath)
+        compiled = self.expandMacros(contents, compiling)
+        compiling.discard(macro.localPath)
+        if(compiled is None):
+            return None
+
+        compiled.files[macro.localPath] = mtime
+        self.compiledMacros[macro.localPath] = compiled
+        return compiled
+
+    def getMacroMtime(self, localPath):
+        try:
+            return os.stat(os.path.join(self.audioDirectory, localPath)).st_mtime_ns
+        except OSError:
+            return None
 
     def processSearchEntry(self, entry):
         entry = entry.strip().lower()
@@ -202,18 +391,18 @@ class Radium:
     def processSearchCommand(self, cmd):
         # lone commands
         if cmd == "@":
-            self.activeSongs = set()
+            self.activeSongs.clear()
             self.activeSongsUpdated()
             return
         if cmd == "?":
-            random.shuffle(self.songQueue)
+            self.shuffleQueue()
             return
 
+        # the modifiers are the run of @ + - * ? at the start
+        # ("-" is searchable too, so the first searchable character can't be where they end)
         split = 0
-        for i in range(len(cmd)):
-            if cmd[i] in searchableChars or cmd[i] == "/":
-                split = i
-                break
+        while split < len(cmd) and cmd[split] in "@+-*?":
+            split += 1
 
         modifiers = cmd[:split]
         search = cmd[split:]
@@ -229,13 +418,13 @@ class Radium:
 
         if "@" in modifiers:  # active mode
             if "+" in modifiers:
-                self.activeSongs += allSelectedSongs
+                self.activeSongs.update(allSelectedSongs)
             elif "-" in modifiers:
-                self.activeSongs -= allSelectedSongs
+                self.activeSongs.difference_update(allSelectedSongs)
             elif "*" in modifiers:
-                self.activeSongs &= allSelectedSongs
+                self.activeSongs.intersection_update(allSelectedSongs)
             else:
-                self.activeSongs = set(allSelectedSongs)
+                self.activeSongs = IndexedSet(allSelectedSongs)
             self.activeSongsUpdated()
         else:  # queue mode
             if "?" in modifiers:
@@ -244,36 +433,48 @@ class Radium:
             if "+" in modifiers:
                 self.songQueue.extend(allSelectedSongs)
             else:
-                self.songQueue = allSelectedSongs + self.songQueue
+                self.songQueue.extendleft(reversed(allSelectedSongs))
             self.songQueueUpdated()
 
     def processSearchTerm(self, term):
-        songPool = self.songs
-
         pathParts = list(filter(len, term.split("/")))
 
         wholeFolder = term[0] == "/" or term[-1] == "/"
 
-        # if /'s are present, find a folder
+        # if /'s are present, find a folder, and search within its slice of the library
+        start = end = None
         if(wholeFolder or len(pathParts) > 1):
             folderParts = pathParts if wholeFolder else pathParts[:-1]
             folder = self.searchFolders(folderParts, self.omnifolder)
 
-            if(folder):
-                songPool = self.getAllSongsInFolder(folder)
-            else:
+            if(not folder):
+                return []
+            if(wholeFolder):
+                return self.getAllSongsInFolder(folder)
+            start, end, _, _ = self.folderSpans[folder.localPath]
+
+        # tag field mode: every song whose tag best matches (e.g. artist:beatles)
+        field, _, value = pathParts[-1].partition(":")
+        if(field.strip() in TagIndex.fields):
+            if(not value.strip()):
                 return []
+            tagIndex = self.getTagIndex()
+            return [self.songsByFolder[pos] for pos in tagIndex.search(field.strip(), value.strip(), start, end)]
 
-        if wholeFolder:
-            return songPool
-        else:
-            songPool.sort(key=lambda song : len(song.searchableName))
-            # single song mode
-            folderSongSNs = list(song.searchableName for song in songPool)
-            foundIndices = stringSearch(pathParts[-1], folderSongSNs, 1)
-            return [songPool[i] for i in foundIndices]
+        # single song mode
+        return [self.songIndex.items[i] for i in self.songIndex.search(pathParts[-1], 1, start, end)]
+
+    def getTagIndex(self):
+        stale = self.tagIndexChanges != self.metadataCache.changes and self.metadataCache.pending == 0
+        if(self.tagIndex is None or stale):
+            self.tagIndexChanges = self.metadataCache.changes
+            self.tagIndex = TagIndex([self.songTable.localPath(song) for song in self.songsByFolder], self.metadataCache)
+        return self.tagIndex
 
     def openSearchScript(self):
+        if(osascript is None):
+            print("osascript isn't available, so there's no search dialog")
+            return None
         ret, result, err = osascript.run("return display dialog \"\" default answer \"\"")
         if(ret):
             return None
@@ -289,31 +490,17 @@ class Radium:
         else:
             self.startPlaying()
     
-    def startPlaying(self, seekTime = -1):
-        self.songStartThread = threading.Thread(target=lambda : self._startPlaying(seekTime=seekTime), daemon=True)
-        self.songStartThread.start()
-        self.songStartThread.join()
-        self.songStartThread = None
-
-    def _startPlaying(self, seekTime = -1):
+    def startPlaying(self):
         self.playing = True
-        self.player.play()
-        if(seekTime >= 0):
-            try:
-                self.currentTime = seekTime
-                self.player.set_time(seekTime)
-            except:
-                pass
-        elif(self.isEnded()):
-            self.player.set_time(1)
-            self.currentTime = 1
-            
-        self.player.set_pause(False)
+        # a song that's run out starts over
+        if(self.songEnded):
+            self.setSong(self.currentSong, addToHistory=False)
+        self.backend.unpause()
         self.playingUpdated()
 
     def pausePlaying(self):
         self.playing = False
-        self.player.set_pause(True)
+        self.backend.pause()
         self.playingUpdated()
 
     def playingUpdated(self):
@@ -322,6 +509,7 @@ class Radium:
     def setLooping(self, newState):
         self.loopingActive = newState
         self.setButtonState("loop", self.loopingActive)
+        self.upcomingUpdated()
 
     def toggleLooping(self):
         self.setLooping(not self.loopingActive)
@@ -329,6 +517,7 @@ class Radium:
     def setAutoplay(self, newState):
         self.autoplayActive = newState
         self.setButtonState("autoplay", self.autoplayActive)
+        self.upcomingUpdated()
 
     def toggleAutoplay(self):
         self.setAutoplay(not self.autoplayActive)
@@ -336,16 +525,33 @@ class Radium:
     def songQueueUpdated(self):
         self.setButtonTitle(
             "clearQueue", f"Queue Size: {len(self.songQueue)}")
+        self.upcomingUpdated()
 
     def activeSongsUpdated(self):
         self.setButtonTitle("activeSongs", f"Active Songs: {len(self.activeSongs) or len(self.songs)}")
+        self.upcomingUpdated()
+
+    def schedulerUpdated(self):
+        self.setButtonTitle("autoplayOrder", self.scheduler.describe())
 
     def clearQueue(self):
         self.songQueue.clear()
         self.songQueueUpdated()
 
+    # shuffling a deque in place would index into its middle for every swap, so shuffle a copy
+    def shuffleQueue(self):
+        songs = list(self.songQueue)
+        random.shuffle(songs)
+        self.songQueue.clear()
+        self.songQueue.extend(songs)
+        self.songQueueUpdated()
+
     def songQueuePop(self, index):
-        item = self.songQueue.pop(index)
+        if(index == 0):
+            item = self.songQueue.popleft()
+        else:
+            item = self.songQueue[index]
+            del self.songQueue[index]
         self.songQueueUpdated()
         return item
 
@@ -380,47 +586,120 @@ class Radium:
     #     self._onStatusIconStart()
         
     def run(self):
-        self.reboot()
+        self.commands.call(self.reboot)
         self.startStatusIcon()
 
     def reboot(self):
         try:
             self.loadConfig()
             self.loadSongList()
+            self.startLibraryWatcher()
             self.setupKeybinds()
-            self.setupVLC()
+            self.setupBackend()
         except BaseException as excep:
             print(excep)
         
-    def setupVLC(self):
-        if(self.player):
-            self.player.release()
-        if(self.vlcInst):
-            self.vlcInst.release()
-
-        self.vlcInst = vlc.Instance()
-        self.player = self.vlcInst.media_player_new()
-        self.player.audio_set_volume(self.volume)
-        self.player.event_manager().event_attach(vlc.EventType.MediaPlayerEndReached, lambda e : self.onSongEnd())
-        self.player.event_manager().event_attach(vlc.EventType.MediaPlayerTimeChanged, lambda e : self.onTimeChanged())
-        self.player.event_manager().event_attach(vlc.EventType.MediaPlayerLengthChanged, lambda e : self.onLengthChanged())
-        self.player.event_manager().event_attach(vlc.EventType.MediaPlayerMediaChanged, lambda e : self.onSongChanged())
+    def setupBackend(self):
+        if(self.backend and self.backendName == self.audioBackend):
+            self.backend.stop()
+            self.backend.setVolume(self.volume / 100)
+            self.backend.setOverlap(self.crossfadeMs)
+            return
+        if(self.backend):
+            self.backend.close()
+        self.backend = self.makeBackend()
+        self.backendName = self.audioBackend
+        self.backend.setVolume(self.volume / 100)
+        if(not self.playing):
+            self.backend.pause()
+
+    def makeBackend(self):
+        # the backend calls these from its own threads, so they're passed on to the command queue
+        callbacks = (
+            lambda : self.commands.call(self.upcomingSong),
+            lambda song : self.commands.put(lambda : self.onBackendSongChanged(song)),
+            lambda : self.commands.put(self.onBackendEnd))
+
+        if(self.audioBackend == "null"):
+            return NullBackend(*callbacks, speed=self.nullBackendSpeed,
+                lengthOf=lambda song : self.commands.call(lambda : self.getSongLength(song)))
+        if(self.audioBackend == "pygame"):
+            if(MixingEngine is None):
+                print("pygame isn't available, so nothing will be heard")
+                return NullBackend(*callbacks)
+            return MixingEngine(*callbacks, self.crossfadeMs)
+        if(self.audioBackend != "vlc"):
+            print(f"unknown audio backend \"{self.audioBackend}\", using vlc")
+        if(VlcBackend is None):
+            print("python-vlc isn't available, so nothing will be heard")
+            return NullBackend(*callbacks)
+        return VlcBackend(*callbacks)
+
+    # called by the backend shortly before the current song ends, for what to play after it
+    # (the song is only peeked at here, and taken once the backend has moved on to it)
+    def upcomingSong(self):
+        song = self.peekUpcoming()
+        self.nextAsked = True
+        self.nextOffered = song
+        if(not song):
+            return None
+        return (os.path.join(self.audioDirectory, self.songTable.localPath(song)), song)
+
+    def peekUpcoming(self):
+        if(not self.autoplayActive):
+            return None
+        return self.currentSong if self.loopingActive else self.peekNext()
+
+    # the backend may have opened what it was given already; if that's no longer what's next, it asks again
+    def upcomingUpdated(self):
+        if(self.nextAsked and self.backend and self.peekUpcoming() != self.nextOffered):
+            self.nextAsked = False
+            self.backend.dropNext()
+
+    def onBackendSongChanged(self, song):
+        self.nextAsked = False
+        # the song came off the front of the queue (unless it's the current song looping)
+        if(len(self.songQueue) and self.songQueue[0] == song and not (self.loopingActive and song == self.currentSong)):
+            self.songQueuePop(0)
+        # a song looping into itself doesn't go in the history
+        self.changeSong(song, addToHistory=song != self.currentSong)
+
+    def onBackendEnd(self):
+        self.songEnded = True
+        self.pausePlaying()
 
     def startStatusIcon(self):
+        if(RadiumStatusIcon is None):
+            return
         if(self.statusIcon):
             self.statusIcon.kill()
         self.statusIcon = RadiumStatusIcon(self)
         self.statusIcon.run()
 
     def setNext(self):
+        song = self.takeNext()
+        if(song):
+            self.setSong(song)
+
+    # the songs autoplay picks from
+    def autoplayPool(self):
+        return self.activeSongs or self.librarySongs
+
+    # the front of the queue, or the scheduler's pick
+    def peekNext(self):
         if(len(self.songQueue)):
-            self.setSong(self.songQueuePop(0))
-        else:
-            candidateSongs = self.songs
-            if(self.activeSongs):
-                candidateSongs = list(self.activeSongs)
+            return self.songQueue[0]
+        pool = self.autoplayPool()
+        if(not pool):
+            return None
+        if(self.nextPick is None or self.nextPick not in pool):
+            self.nextPick = self.scheduler.next(pool)
+        return self.nextPick
 
-            self.setSong(random.choice(candidateSongs))
+    def takeNext(self):
+        if(len(self.songQueue)):
+            return self.songQueuePop(0)
+        return self.peekNext()
 
     def playNext(self):
         self.setNext()
@@ -428,10 +707,19 @@ class Radium:
 
     # don't bother trying to split into setPrev/playPrev; it screws things up
     def playPrev(self):
-        if(self.historyStack):
-            stakItem = self.historyStack.pop()
-            self.setSong(stakItem[0], addToHistory=False)
-            self.startPlaying(seekTime=stakItem[1])
+        song, prevTime = self.popHistory()
+        if(song):
+            self.setSong(song, addToHistory=False, startMs=prevTime)
+            self.startPlaying()
+
+    # the newest song in the history that's still in the library, and the time it was left at
+    def popHistory(self):
+        while(len(self.historyStack)):
+            localPath, prevTime = self.historyStack.pop()
+            song = self.getSongByPath(localPath)
+            if(song):
+                return song, prevTime
+        return None, 0
 
     def _setButtonTitle(self, button, title):
         self.statusIcon.buttons[button].title = title
@@ -446,54 +734,45 @@ class Radium:
         self.queueStatusIconTask(lambda:self._setButtonState(button, state))
 
     def getVolume(self):
-        return self.player.audio_get_volume()
+        return self.volume
 
     def setVolume(self, newPercent):
         self.volume = int(max(0, min(100, newPercent)))
-        self.player.audio_set_volume(self.volume)
+        self.backend.setVolume(self.volume / 100)
         self.setButtonTitle("volume", f"Volume: {self.volume}%")
 
-    def decrementVolume(self):
-        self.setVolume(self.volume - self.volumeModifyAmount)
+    def moveVolume(self, steps):
+        self.setVolume(self.volume + steps * self.volumeModifyAmount)
 
-    def incrementVolume(self):
-        self.setVolume(self.volume + self.volumeModifyAmount)
+    def getTime(self):
+        return self.backend.getPos()
 
-    def isEnded(self):
-        return self.player.get_state() == vlc.State.Ended
-
-    def decrementTime(self):
-        self.seekTimeSafe(self.currentTime - self.timeModifyAmount)
-
-    def incrementTime(self):
-        self.seekTimeSafe(self.currentTime + self.timeModifyAmount)
+    def moveTime(self, steps):
+        self.seekTimeSafe(self.getTime() + steps * self.timeModifyAmount)
 
     def seekPercent(self, percent):
-        self.seekTimeSafe((percent * self.currentSongLength) // 100)
+        self.seekTimeSafe((percent * self.getCurrentSongLength()) // 100)
 
     def seekTimeSafe(self, timeMs):
         if(not self.currentSong):
             return
 
-        if(self.currentSongLength == -1):
+        length = self.getCurrentSongLength()
+        if(length <= 0):
             return
 
-        self.currentTime = timeMs
-        if(self.currentTime >= self.currentSongLength):
+        if(timeMs >= length):
             self.setNext()
             return
 
-        timeMs = max(1, min(self.currentSongLength, timeMs))
-        playing = self.playing
-        
-        self.setSong(self.currentSong, addToHistory=False)
-        self.currentTime = timeMs
+        timeMs = max(1, timeMs)
 
-        if(playing):
-            self.startPlaying(seekTime=timeMs)
-        else:
-            self.startPlaying(seekTime=timeMs)
-            self.pausePlaying()
+        # a loaded song seeks in place (held back by the backend if seeks come too fast for it);
+        # an ended one is loaded again at that time (and stays paused)
+        if(self.songEnded):
+            self.setSong(self.currentSong, addToHistory=False, startMs=timeMs)
+            return
+        self.backend.seek(timeMs)
 
     def doQuit(self):
         os._exit(0)
@@ -525,25 +804,58 @@ class Radium:
                     self.folderSearchLimit = int(parts[1])
                 elif cmd == "macro call limit":
                     self.macroCallLimit = int(parts[1])
+                elif cmd == "library cache file":
+                    self.libraryCachePath = parts[1]
+                elif cmd == "watch library":
+                    self.watchLibrary = parts[1].lower() == "true"
+                elif cmd == "library scan workers":
+                    self.libraryScanWorkers = int(parts[1])
+                elif cmd == "history file":
+                    self.historyPath = parts[1]
+                elif cmd == "autoplay order":
+                    self.autoplayOrder = parts[1].lower()
+                elif cmd == "metadata cache file":
+                    self.metadataCachePath = parts[1]
+                elif cmd == "metadata probe workers":
+                    self.metadataProbeWorkers = int(parts[1])
+                elif cmd == "crossfade (ms)":
+                    self.crossfadeMs = int(parts[1])
+                elif cmd == "audio backend":
+                    self.audioBackend = parts[1].lower()
+                elif cmd == "null backend speed":
+                    self.nullBackendSpeed = float(parts[1])
 
     def readMacroFile(self, path):
         path = os.path.join(self.audioDirectory, path)
-        with open(path, "r") as file:
-            return " ".join(line.strip() for line in file)
+        try:
+            with open(path, "r") as file:
+                return " ".join(line.strip() for line in file)
+        except OSError as excep:
+            print(excep)
+            return None
                 
 
     def loadSongList(self):
-        tempFolderMap = dict()
+        self.folderPaths.clear()
         self.songs.clear()
+        self.songTable.clear()
         self.folders.clear()
         self.macros.clear()
 
         self.activeSongs.clear()
+        self.librarySongs.clear()
         self.songQueue.clear()
-        self.historyStack.clear()
+        # play counts and the like are kept per song, and every song is new after a reload
+        self.scheduler = makeScheduler(self.autoplayOrder)
+        self.nextPick = None
+        self.schedulerUpdated()
+
+        # the history outlives reboots (and crashes), so it's read back rather than cleared
+        self.historyStack.close()
+        self.historyStack = HistoryLog(self.historyPath, self.maxHistoryStackSize)
 
         self.currentSong = None
-        self.currentTime = 1
+        self.songEnded = False
         self.activeSongsUpdated()
         self.songQueueUpdated()
         self.currentSongUpdated()
@@ -551,93 +863,243 @@ class Radium:
         self.omnifolder = Folder(
             name = "everything",
             searchableName = ".",
+            localPath = None,
             subFolders = self.folders,
             songs = self.songs,
             macros = self.macros
         )
 
-        for root, dirs, files in os.walk(self.audioDirectory):
-            # filter out folders staring with .
-            dirs[:] = filter(lambda name: name[0] != ".", dirs)
-
-            rootLocalPath = os.path.relpath(root, self.audioDirectory)
+        # unchanged directories are read back from the cache instead of being listed again
+        self.libraryCache = LibraryCache(
+            self.libraryCachePath, self.audioDirectory, self.acceptedAudioTypes, self.libraryScanWorkers)
+        for rootLocalPath, dirs, files in self.libraryCache.walk():
             folderSongs = list()
             folderMacros = list()
-            subFolders = list()
 
             isRoot = rootLocalPath == "."
-            folderName = "." if isRoot else os.path.basename(root)
+            folderName = "." if isRoot else os.path.basename(rootLocalPath)
 
             folder = Folder(
                 name=folderName,
                 searchableName=makeSearchable(folderName),
-                subFolders=subFolders,
+                localPath=rootLocalPath,
+                subFolders=list(),
                 songs=folderSongs,
                 macros=folderMacros
             )
             self.folders.append(folder)
-            tempFolderMap[folderName] = folder
-            subFolders.extend(dirs)
+            self.folderPaths[rootLocalPath] = folder
 
-            # register songs
-            for file in files:
-                localPath = os.path.join(rootLocalPath, file)
+            # folders come out parents first, so the parent is always registered already
+            if(not isRoot):
+                self.getParentFolder(folder).subFolders.append(folder)
 
-                fileName = os.path.split(localPath)[1]
-                fileNameParts = fileName.split(".")
-                fileType = fileNameParts[-1]
-                songName = "".join(fileNameParts[:-1]).split("@")[0]
+            # register songs
+            for fileName, fileType, songName, searchableName in files:
+                localPath = os.path.join(rootLocalPath, fileName)
                 if(fileType == "smco"):
                     macro = Macro(
                         name=songName,
-                        searchableName=makeSearchable(songName),
+                        searchableName=searchableName,
                         localPath=localPath
                     )
                     self.macros.append(macro)
                     folderMacros.append(macro)
-                elif(fileType in self.acceptedAudioTypes):
-                    song = Song(
-                        name=songName,
-                        searchableName=makeSearchable(songName),
-                        localPath=localPath)
+                else:
+                    song = self.songTable.add(songName, searchableName, localPath)
                     self.songs.append(song)
                     folderSongs.append(song)
 
-        for folder in self.folders:
-            subFolderRefs = list()
-            for name in folder.subFolders:
-                subFolderRefs.append(tempFolderMap[name])
-            folder.subFolders[:] = subFolderRefs
-        
-        self.songs.sort(key=lambda song : len(song.searchableName))
+        self.libraryCache.save()
+
+        self.songs.sort(key=lambda song : len(self.songTable.searchableName(song)))
         self.folders.sort(key=lambda fold : len(fold.searchableName))
+        self.folderIndex = SearchIndex([fold.searchableName for fold in self.folders], self.folders)
         self.macros.sort(key=lambda mac : len(mac.searchableName))
+
+        # the indexes rank by name length, then by position in the folder layout,
+        # so a folder's slice searches the same as its songs sorted by length would
+        self.updateFolderSpans()
+        self.songIndex = SearchIndex([self.songTable.searchableName(song) for song in self.songsByFolder], self.songsByFolder)
+        self.macroIndex = SearchIndex([mac.searchableName for mac in self.macrosByFolder], self.macrosByFolder)
+        self.librarySongs.update(self.songs)
         self.activeSongsUpdated()
 
+        # durations and tags are read in the background; a song that comes up before that gets to it is read on the spot
+        if(self.metadataCache):
+            self.metadataCache.close()
+        self.metadataCache = MetadataCache(self.metadataCachePath, self.audioDirectory, self.metadataProbeWorkers)
+        localPaths = [self.songTable.localPath(song) for song in self.songs]
+        self.metadataCache.retain(localPaths)
+        # only new files, and files in directories that have changed, are probed again
+        # (a file edited in place, without its directory changing, keeps what was cached)
+        self.metadataCache.probeAll(localPath for localPath in localPaths
+            if self.metadataCache.get(localPath) is None or os.path.dirname(localPath) in self.libraryCache.changedDirs)
+
+    def startLibraryWatcher(self):
+        if(self.libraryWatcher):
+            self.libraryWatcher.stop()
+            self.libraryWatcher = None
+        if(not self.watchLibrary):
+            return
 
-    def onSongEnd(self):
-        songEndThread = threading.Thread(target=self._onSongEnd, daemon=True)
-        songEndThread.start()
+        self.libraryWatcher = LibraryWatcher(
+            self.audioDirectory, lambda localPaths : self.commands.put(lambda : self.onLibraryDirsChanged(localPaths)))
+        for localPath in self.folderPaths:
+            self.libraryWatcher.watchDir(localPath)
+        self.libraryWatcher.start()
+
+    # brings the folders at the given local paths up to date with what's on disk,
+    # keeping the current song, queue and history (minus any songs that are gone)
+    # (the watcher's thread only reports changes; they're applied here, on the command queue like searches,
+    # so the library never changes under a search)
+    def onLibraryDirsChanged(self, localPaths):
+        # parents first, so new subfolders are only added once
+        for localPath in sorted(localPaths, key=lambda path: (path != ".", path.count(os.sep))):
+            self.syncFolder(localPath)
+        self.dropRemovedItems()
+        self.updateFolderSpans()
+        self.songIndex.setOrder(self.songsByFolder)
+        self.macroIndex.setOrder(self.macrosByFolder)
+        self.libraryCache.save()
+        self.activeSongsUpdated()
+        self.songQueueUpdated()
 
-    def _onSongEnd(self):
-        if(self.autoplayActive):
-            if(self.loopingActive):
-                self.setSong(self.currentSong, addToHistory=False)
-                self.startPlaying()
-            else:
-                self.playNext()
+    def syncFolder(self, localPath):
+        folder = self.folderPaths.get(localPath)
+        if(folder is None):
+            return
 
-    def setupKeybinds(self):
-        threading.Thread(target=self._setupKeybinds, daemon=True).start()
+        listing = self.libraryCache.listDir(localPath, force=True)
+        if(listing is None):
+            self.removeFolderTree(localPath)
+            return
+        _, dirs, files = listing
+
+        knownItems = {os.path.basename(self.songTable.localPath(song)): song for song in folder.songs}
+        knownItems.update((os.path.basename(macro.localPath), macro) for macro in folder.macros)
+        listedNames = set(fileName for fileName, _, _, _ in files)
+        for fileName, item in knownItems.items():
+            if(fileName not in listedNames):
+                self.removeLibraryItem(folder, item)
+        for fileName, fileType, songName, searchableName in files:
+            if(fileName not in knownItems):
+                self.addLibraryItem(folder, localPath, fileName, fileType, songName, searchableName)
+
+        for sub in list(folder.subFolders):
+            if(sub.name not in dirs):
+                self.removeFolderTree(sub.localPath)
+        for name in dirs:
+            subPath = os.path.normpath(os.path.join(localPath, name))
+            if(subPath not in self.folderPaths):
+                self.addFolderTree(subPath)
+
+    def addFolderTree(self, localPath):
+        for folderPath, dirs, files in self.libraryCache.walk(localPath):
+            folderName = os.path.basename(folderPath)
+            folder = Folder(
+                name=folderName,
+                searchableName=makeSearchable(folderName),
+                localPath=folderPath,
+                subFolders=list(),
+                songs=list(),
+                macros=list()
+            )
+            self.folders.append(folder)
+            self.folderIndex.add(folder.searchableName, folder)
+            self.folderPaths[folderPath] = folder
+            self.getParentFolder(folder).subFolders.append(folder)
+            for fileName, fileType, songName, searchableName in files:
+                self.addLibraryItem(folder, folderPath, fileName, fileType, songName, searchableName)
+            if(self.libraryWatcher):
+                self.libraryWatcher.watchDir(folderPath)
+
+    def removeFolderTree(self, localPath):
+        folder = self.folderPaths.pop(localPath, None)
+        if(folder is None):
+            return
+
+        for sub in list(folder.subFolders):
+            self.removeFolderTree(sub.localPath)
+        for item in folder.songs + folder.macros:
+            self.removeLibraryItem(folder, item)
+
+        # folders hold lists, so compare them by identity rather than by value
+        self.folders[:] = [fold for fold in self.folders if fold is not folder]
+        self.folderIndex.remove(folder)
+        parent = self.getParentFolder(folder)
+        if(parent):
+            parent.subFolders[:] = [sub for sub in parent.subFolders if sub is not folder]
+        self.libraryCache.forget(localPath)
+        if(self.libraryWatcher):
+            self.libraryWatcher.unwatchDir(localPath)
+
+    def addLibraryItem(self, folder, folderPath, fileName, fileType, songName, searchableName):
+        localPath = os.path.join(folderPath, fileName)
+        if(fileType == "smco"):
+            macro = Macro(name=songName, searchableName=searchableName, localPath=localPath)
+            folder.macros.append(macro)
+            self.macros.append(macro)
+            self.macroIndex.add(searchableName, macro)
+        else:
+            song = self.songTable.add(songName, searchableName, localPath)
+            folder.songs.append(song)
+            self.songs.append(song)
+            self.songIndex.add(searchableName, song)
+            self.librarySongs.add(song)
+            self.metadataCache.probeAll([localPath])
+
+    # a removed song stays playing if it's the current song, but is dropped from everything else
+    # (the item stays in the folder's and the library's lists until dropRemovedItems)
+    def removeLibraryItem(self, folder, item):
+        self.removedFrom[folder.localPath] = folder
+        if(isinstance(item, Macro)):
+            self.removedMacros.add(item)
+            self.macroIndex.remove(item)
+            return
 
-    def _setupKeybinds(self):
+        self.removedSongs.add(item)
+        self.songIndex.remove(item)
+        localPath = self.songTable.localPath(item)
+        self.removedPaths.add(localPath)
+        self.songTable.remove(item)
+        self.metadataCache.forget(localPath)
+        self.activeSongs.discard(item)
+        self.librarySongs.discard(item)
+
+    # takes everything removeLibraryItem removed out of the lists still holding it, one pass per list
+    def dropRemovedItems(self):
+        songs, macros = self.removedSongs, self.removedMacros
+        for folder in self.removedFrom.values():
+            folder.songs[:] = [song for song in folder.songs if song not in songs]
+            folder.macros[:] = [macro for macro in folder.macros if macro not in macros]
+        if(songs):
+            self.songs[:] = [song for song in self.songs if song not in songs]
+            kept = [song for song in self.songQueue if song not in songs]
+            self.songQueue.clear()
+            self.songQueue.extend(kept)
+            self.historyStack.remove(self.removedPaths)
+        if(macros):
+            self.macros[:] = [macro for macro in self.macros if macro not in macros]
+
+        self.removedSongs = set()
+        self.removedMacros = set()
+        self.removedPaths = set()
+        self.removedFrom = dict()
+
+
+    # (reboots run on the command queue rather than inside the hook, so the hook can be swapped out right away)
+    def setupKeybinds(self):
         self.ctrlDown = False
         self.shiftDown = False
 
-        if(self.prevKeyHook):
-            keyboard.unhook(self.prevKeyHook)
-        # threading.Thread(target=lambda:keyboard.hook(self.keyEvent, suppress=True), daemon=True).start()
-        self.prevKeyHook = keyboard.hook(self.keyEvent, suppress=True)
+        if(keyboard is None):
+            print("keyboard isn't available, so the key bindings won't be hooked")
+        else:
+            if(self.prevKeyHook):
+                keyboard.unhook(self.prevKeyHook)
+            # threading.Thread(target=lambda:keyboard.hook(self.keyEvent, suppress=True), daemon=True).start()
+            self.prevKeyHook = keyboard.hook(self.keyEvent, suppress=True)
 
         self.keybinds["f"] = self.doSearch
 
@@ -647,22 +1109,15 @@ class Radium:
         self.keybinds["z"] = self.playPrev
         self.keybinds["x"] = self.playNext
 
-        self.keybinds["-"] = self.decrementVolume
-        self.keybinds["="] = self.incrementVolume
+        # presses that pile up while the player is busy are merged into one step
+        self.keybinds["-"] = MergedCommand("volume", self.moveVolume, -1, summed=True)
+        self.keybinds["="] = MergedCommand("volume", self.moveVolume, 1, summed=True)
 
-        self.keybinds["["] = self.decrementTime
-        self.keybinds["]"] = self.incrementTime
+        self.keybinds["["] = MergedCommand("time", self.moveTime, -1, summed=True)
+        self.keybinds["]"] = MergedCommand("time", self.moveTime, 1, summed=True)
 
-        self.keybinds["0"] = lambda: self.seekPercent(0)
-        self.keybinds["1"] = lambda: self.seekPercent(10)
-        self.keybinds["2"] = lambda: self.seekPercent(20)
-        self.keybinds["3"] = lambda: self.seekPercent(30)
-        self.keybinds["4"] = lambda: self.seekPercent(40)
-        self.keybinds["5"] = lambda: self.seekPercent(50)
-        self.keybinds["6"] = lambda: self.seekPercent(60)
-        self.keybinds["7"] = lambda: self.seekPercent(70)
-        self.keybinds["8"] = lambda: self.seekPercent(80)
-        self.keybinds["9"] = lambda: self.seekPercent(90)
+        for digit in range(10):
+            self.keybinds[str(digit)] = MergedCommand("seek", self.seekPercent, digit * 10, summed=False)
 
         self.keybinds["a"] = self.toggleAutoplay
         self.keybinds["l"] = self.toggleLooping
@@ -670,17 +1125,28 @@ class Radium:
 
         self.keybinds["q"] = self.doQuit
         self.keybinds["r"] = self.reboot
-        self.keybinds["t"] = lambda : threading.Thread(
-                target=lambda : osascript.run(f"return display alert \"Threads: {threading.active_count()}\""), daemon=True).start()
+        self.keybinds["t"] = self.showStats
+
+    def showStats(self):
+        title = f"Threads: {threading.active_count()}"
+        lines = [f"Key hook: {self.hookLatency.describe()}", f"Command wait: {self.commands.waitLatency.describe()}"]
+        if(osascript is None):
+            print("\n".join([title] + lines))
+            return
+        message = "\\n".join(lines)
+        threading.Thread(
+            target=lambda : osascript.run(f"return display alert \"{title}\" message \"{message}\""),
+            daemon=True).start()
 
+    # called on the hook's thread for every key event on the machine (which waits on it),
+    # so it only works out which command was pressed, and leaves running it to the command queue
     def keyEvent(self, e):
-        if(self.songStartThread):
-            self.songStartThread.join()
+        hookStart = time.perf_counter()
         if(e.event_type == "down"):
             if self.ctrlDown and self.shiftDown:
-                func = self.keybinds.get(e.name, None)
-                if(func):
-                    func()
+                command = self.keybinds.get(e.name, None)
+                if(command):
+                    self.commands.put(command)
             else:
                 if e.name == "shift":
                     self.shiftDown = True
@@ -691,7 +1157,9 @@ class Radium:
                 self.shiftDown = False
             elif e.name == "ctrl":
                 self.ctrlDown = False
+        self.hookLatency.record(time.perf_counter() - hookStart)
 
 
-rad = Radium()
-rad.run()
+if __name__ == "__main__":
+    rad = Radium()
+    rad.run()
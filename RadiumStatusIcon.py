@@ -13,7 +13,8 @@ class RadiumStatusIcon(rumps.App):
             "volume": rumps.MenuItem("Volume: 100%"),
             "song": rumps.MenuItem("----"),
             "songLength": rumps.MenuItem("----"),
-            "activeSongs": rumps.MenuItem("----")
+            "activeSongs": rumps.MenuItem("----"),
+            "autoplayOrder": rumps.MenuItem("----")
         }
 
         self.buttons["autoplay"].state = True
@@ -28,13 +29,14 @@ class RadiumStatusIcon(rumps.App):
             self.buttons["song"],
             self.buttons["songLength"],
             self.buttons["activeSongs"],
+            self.buttons["autoplayOrder"],
             None,
             rebootButton
         ]
 
         @rumps.clicked("Reboot")
         def reboot(_):
-            self.inst.reboot()
+            self.inst.commands.put(self.inst.reboot)
     
     def kill(self):
         rumps.quit_application()
\ No newline at end of file
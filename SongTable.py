@@ -0,0 +1,63 @@
+from array import array
+
+# which of a song's fields is which
+nameField = 0
+searchableNameField = 1
+localPathField = 2
+fieldCount = 3
+
+
+# every song in the library, with songs as integer ids instead of an object (and three strings) per song
+# the fields of every song sit back to back in one utf-8 buffer, in id order, and
+# fieldStarts[fieldCount * (id - firstId) + field] is where a field starts (the entry after it is where it ends)
+#
+# ids start at 1, so a song is never falsy, and are never handed out twice
+# (not even after a clear, so an id left over from before one can't be mistaken for a new song)
+# a removed song's text stays in the buffer until the table is cleared
+class SongTable:
+    def __init__(self):
+        self.nextId = 1
+        self.clear()
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, song):
+        return self.firstId <= song < self.nextId and self.alive[song - self.firstId] == 1
+
+    def clear(self):
+        self.firstId = self.nextId
+        self.buffer = bytearray()
+        self.fieldStarts = array("I", [0])
+        self.alive = bytearray()
+        self.count = 0
+
+    def add(self, name, searchableName, localPath):
+        for text in (name, searchableName, localPath):
+            self.buffer += text.encode("utf-8")
+            self.fieldStarts.append(len(self.buffer))
+        self.alive.append(1)
+        self.count += 1
+        self.nextId += 1
+        return self.nextId - 1
+
+    def remove(self, song):
+        if(song in self):
+            self.alive[song - self.firstId] = 0
+            self.count -= 1
+
+    # (a removed song's fields can still be read, but not once the table has been cleared)
+    def field(self, song, field):
+        if(not self.firstId <= song < self.nextId):
+            raise KeyError(song)
+        pos = fieldCount * (song - self.firstId) + field
+        return self.buffer[self.fieldStarts[pos]:self.fieldStarts[pos + 1]].decode("utf-8")
+
+    def name(self, song):
+        return self.field(song, nameField)
+
+    def searchableName(self, song):
+        return self.field(song, searchableNameField)
+
+    def localPath(self, song):
+        return self.field(song, localPathField)
@@ -1,120 +1,451 @@
+import bisect
+from collections import defaultdict
+
 searchableChars = set("abcdefghijklmnopqrstuvwxyz _-&1234567890")
 def makeSearchable(name):
     return "".join(filter(lambda c : c in searchableChars, name.strip().lower()))
 
+# yields the indices of the best matches in folder, best first, at most limit of them
+# tiers: exact, first word, word, prefixed, continuous prefixed sequence, prefixed sequence, contained
+#
+# the cheap tiers (exact through prefixed) are found in one pass, keeping at most limit of each;
+# the sequence and contained tiers each take another pass, and only if there is still room for them
 def stringSearch(term, folder, limit=1):
-    foundExact = list()
+    if(limit <= 0):
+        return
+
     foundFirstWord = list()
     foundWord = list()
     foundPrefixed = list()
-    foundContinuousPrefixedSequence = list()
-    foundPrefixedSequence = list()
-    foundContained = list()
+    claimed = set()
+    spaceAccountings = list()
 
     noSpace = ' ' not in term
-    
-    termLen = len(term)
-    
+    found = 0
+
     for i in range(len(folder)):
         item = folder[i]
         spaceAccounting = item
         if(noSpace):
             spaceAccounting = item.replace(' ', '')
+        spaceAccountings.append(spaceAccounting)
 
+        # nothing can outrank an exact match, so it can be given out straight away
         if(spaceAccounting == term):
-            foundExact.append(i)
+            claimed.add(i)
+            yield i
+            found += 1
+            if(found >= limit):
+                return
             continue
 
+        higherTiers = found
         if(noSpace):
             words = item.split(" ")
             if(len(words) > 1):
-                first = words[0]
-                rest = words[1:]
-                if(len(foundFirstWord) > limit):
-                    continue
-                if(first == term):
-                    foundFirstWord.append(i)
+                if(words[0] == term):
+                    claimed.add(i)
+                    if(len(foundFirstWord) < limit):
+                        foundFirstWord.append(i)
                     continue
 
-                if(len(foundWord) > limit):
+                higherTiers += len(foundFirstWord)
+                if(higherTiers >= limit):
                     continue
-                if(term in rest):
+                if(term in words[1:]):
+                    claimed.add(i)
                     foundWord.append(i)
                     continue
 
-        if(len(foundPrefixed) > limit):
+        higherTiers = found + len(foundFirstWord) + len(foundWord)
+        if(higherTiers >= limit):
             continue
         if(spaceAccounting.startswith(term)):
+            claimed.add(i)
             foundPrefixed.append(i)
             continue
 
-        if(len(foundContinuousPrefixedSequence) > limit):
-            continue
-        if(containsContinuousPrefixedSequence(item, term, 1)):
-            foundContinuousPrefixedSequence.append(i)
-            continue
+    for tier in (foundFirstWord, foundWord, foundPrefixed):
+        for i in tier:
+            yield i
+            found += 1
+            if(found >= limit):
+                return
 
-        if(len(foundPrefixedSequence) > limit):
-            continue
-        if(containsPrefixedSequence(item, term)):
-            foundPrefixedSequence.append(i)
-            continue
+    checks = (
+        lambda i: containsContinuousPrefixedSequence(folder[i], term, 1),
+        lambda i: containsPrefixedSequence(folder[i], term),
+        lambda i: term in spaceAccountings[i],
+    )
+    for check in checks:
+        for i in range(len(folder)):
+            if(i in claimed or not check(i)):
+                continue
+            claimed.add(i)
+            yield i
+            found += 1
+            if(found >= limit):
+                return
 
-        if(len(foundContained) > limit):
-            continue
-        if(term in spaceAccounting):
-            foundContained.append(i)
-            continue
-
-    return (
-        foundExact + \
-        foundFirstWord + \
-        foundWord + \
-        foundPrefixed + \
-        foundContinuousPrefixedSequence + \
-        foundPrefixedSequence + \
-        foundContained \
-        )[:limit]
+# both matchers walk the string once, keeping the set of reachable term positions
+# for every string position as a bitmask (bit q set = term[:q] has been matched)
+#
+# from term position q at string position p:
+#   - a space in the term jumps to the start of the next word (or stays put if there is none)
+#   - a matching character advances both positions by one
+#   - otherwise the term may resume at the start of the next word
+# states with more of the term left than the string are dropped
 
 def containsContinuousPrefixedSequence(string, term, spaces=0):
     if(spaces > 1):
         return False
+    return _matchPrefixedSequence(string, term, spaces, True)
 
-    if(len(term) > len(string)):
-        return False
+def containsPrefixedSequence(string, term):
+    return _matchPrefixedSequence(string, term, 0, False)
 
-    if(len(term) == 0):
-        return True
+def _termMasks(term):
+    charMasks = dict()
+    spaceMask = 0
+    for q in range(len(term)):
+        if(term[q] == ' '):
+            spaceMask |= 1 << q
+        else:
+            charMasks[term[q]] = charMasks.get(term[q], 0) | (1 << q)
+    return charMasks, spaceMask
 
-    if(term[0] == ' '):
-        nextSpacePos = string.find(' ')
-        return containsContinuousPrefixedSequence(string[nextSpacePos+1:], term[1:])
-        
-    thisAndRest = (term[0] == string[0] and containsContinuousPrefixedSequence(string[1:], term[1:]))
-    if(thisAndRest):
+# continuous: only one word may be skipped between matched characters
+def _matchPrefixedSequence(string, term, spaces, continuous):
+    stringLen = len(string)
+    termLen = len(term)
+    if(termLen > stringLen):
+        return False
+    if(termLen == 0):
         return True
-    
-    nextSpacePos = string.find(' ')
-    if(nextSpacePos >= 0):
-        return containsContinuousPrefixedSequence(string[nextSpacePos+1:], term, spaces+1)
-    return False
 
-def containsPrefixedSequence(string, term):
-    if(len(term) > len(string)):
+    # most strings are ruled out before the walk: the term's first character has to start a word
+    # (or the string itself, if no word may be skipped yet), and its other characters have to follow in order
+    first = term[0]
+    if(first != ' ' and string[0] != first and (continuous and spaces or ' ' + first not in string)):
         return False
+    p = 0
+    for c in term:
+        if(c != ' '):
+            p = string.find(c, p) + 1
+            if(p == 0):
+                return False
 
-    if(len(term) == 0):
-        return True
+    charMasks, spaceMask = _termMasks(term)
+    goal = 1 << termLen
+    wordMask = (goal - 1) & ~spaceMask
 
-    if(term[0] == ' '):
-        nextSpacePos = string.find(' ')
-        return containsPrefixedSequence(string[nextSpacePos+1:], term[1:])
+    # states reached by matching a character, and (if continuous) by skipping a word
+    fresh = [0] * (stringLen + 1)
+    skipped = [0] * (stringLen + 1)
+    if(continuous and spaces):
+        skipped[0] = 1
+    else:
+        fresh[0] = 1
 
-    thisAndRest = (term[0] == string[0] and containsPrefixedSequence(string[1:], term[1:]))
-    if(thisAndRest):
-        return True
-    
-    nextSpacePos = string.find(' ')
-    if(nextSpacePos >= 0):
-        return containsPrefixedSequence(string[nextSpacePos+1:], term)
+    furthest = 0
+    nextSpace = string.find(' ')
+    for p in range(stringLen + 1):
+        if(p > furthest):
+            return False
+
+        current = fresh[p]
+        currentSkipped = skipped[p]
+        if(not (current or currentSkipped)):
+            continue
+
+        minTermPos = termLen - (stringLen - p)
+        if(minTermPos > 0):
+            keep = ~((1 << minTermPos) - 1)
+            current &= keep
+            currentSkipped &= keep
+
+        if(nextSpace != -1 and nextSpace < p):
+            nextSpace = string.find(' ', p)
+
+        if(nextSpace == -1):
+            moving = (current | currentSkipped) & spaceMask
+            while(moving):
+                moved = moving << 1
+                current |= moved
+                moving = moved & spaceMask
+
+        states = current | currentSkipped
+        if(states & goal):
+            return True
+        if(p == stringLen):
+            break
+
+        matched = states & charMasks.get(string[p], 0)
+        if(matched):
+            fresh[p + 1] |= matched << 1
+            furthest = max(furthest, p + 1)
+
+        if(nextSpace != -1):
+            wordStart = nextSpace + 1
+            fresh[wordStart] |= (states & spaceMask) << 1
+            if(continuous):
+                skipped[wordStart] |= current & wordMask
+            else:
+                fresh[wordStart] |= states & wordMask
+            furthest = max(furthest, wordStart)
     return False
+
+# lookup tables over a list of searchable names (and the items they name), built for the first search
+# entries are ranked by name length, then position, so search() yields the same results as
+# stringSearch(term, names, limit) would over the names stable-sorted by length,
+# but only visits the entries that can possibly match each tier
+#
+# an entry's position starts out as its index; setOrder() can rearrange them,
+# and searches can be limited to a [start, end) span of positions
+#
+# entries can be added and removed in place; every entry keeps its index for good,
+# and removed entries are left as gaps
+class SearchIndex:
+    def __init__(self, names, items=None):
+        self.names = list()
+        self.noSpaceNames = list()
+        self.items = list()
+        # id(item) -> index, so unhashable items (like folders) can be removed too
+        self.itemIds = dict()
+        self.count = 0
+
+        # index -> position, and position -> index
+        self.positions = list()
+        self.order = list()
+
+        # while entries are in name length order (and in position order), index order is rank order
+        self.ordered = True
+        self.longestName = 0
+
+        # (an index that's rebuilt on every reboot, like the library's, costs next to nothing until it's searched)
+        self.built = False
+
+        if(items is None):
+            items = names
+        for name, item in zip(names, items):
+            self._append(name, item)
+
+    # fills in the postings and prefix tables for every entry there is so far
+    def _build(self):
+        self.built = True
+
+        # entries keyed by their exact text (with and without spaces)
+        self.exactPostings = defaultdict(list)
+        self.exactNoSpacePostings = defaultdict(list)
+        # multi-word entries keyed by their first word / any later word
+        self.firstWordPostings = defaultdict(list)
+        self.restWordPostings = defaultdict(list)
+        # entries keyed by their first character / the first characters of their words
+        self.firstCharPostings = defaultdict(list)
+        self.initialPostings = defaultdict(list)
+        # entries keyed by every character / trigram they contain (spaces removed)
+        self.charPostings = defaultdict(list)
+        self.trigramPostings = defaultdict(list)
+
+        live = [i for i in range(len(self.names)) if self.names[i] is not None]
+        for i in live:
+            self._post(i)
+
+        # sorted (text, index) pairs, for finding every entry starting with a prefix
+        self.prefixTable = sorted((self.names[i], i) for i in live)
+        self.noSpacePrefixTable = sorted((self.noSpaceNames[i], i) for i in live)
+
+    def __len__(self):
+        return self.count
+
+    def add(self, name, item=None):
+        if(item is None):
+            item = name
+        i = self._append(name, item)
+        if(self.built):
+            self._post(i)
+            bisect.insort(self.prefixTable, (name, i))
+            bisect.insort(self.noSpacePrefixTable, (self.noSpaceNames[i], i))
+        return i
+
+    def remove(self, item):
+        i = self.itemIds.pop(id(item), None)
+        if(i is None):
+            return
+
+        if(self.built):
+            name = self.names[i]
+            del self.prefixTable[bisect.bisect_left(self.prefixTable, (name, i))]
+            noSpaceName = self.noSpaceNames[i]
+            del self.noSpacePrefixTable[bisect.bisect_left(self.noSpacePrefixTable, (noSpaceName, i))]
+
+        # postings still mention the entry; searches skip it from now on
+        self.names[i] = None
+        self.noSpaceNames[i] = None
+        self.items[i] = None
+        self.count -= 1
+
+    def _append(self, name, item):
+        i = len(self.names)
+        if(len(name) < self.longestName):
+            self.ordered = False
+        self.longestName = max(self.longestName, len(name))
+
+        noSpace = name.replace(' ', '')
+        self.names.append(name)
+        self.noSpaceNames.append(noSpace)
+        self.items.append(item)
+        self.itemIds[id(item)] = i
+        self.positions.append(len(self.order))
+        self.order.append(i)
+        self.count += 1
+        return i
+
+    def _post(self, i):
+        name = self.names[i]
+        noSpace = self.noSpaceNames[i]
+
+        self.exactPostings[name].append(i)
+        self.exactNoSpacePostings[noSpace].append(i)
+
+        words = name.split(" ")
+        if(len(words) > 1):
+            self.firstWordPostings[words[0]].append(i)
+            for word in set(words[1:]):
+                self.restWordPostings[word].append(i)
+
+        if(name):
+            self.firstCharPostings[name[0]].append(i)
+        for initial in {word[0] for word in words if word}:
+            self.initialPostings[initial].append(i)
+
+        for c in set(noSpace):
+            self.charPostings[c].append(i)
+        for gram in {noSpace[j:j+3] for j in range(len(noSpace) - 2)}:
+            self.trigramPostings[gram].append(i)
+
+    # puts the entries for the given items at positions 0, 1, 2, ... in that order
+    def setOrder(self, items):
+        self.order = [self.itemIds[id(item)] for item in items]
+        for pos in range(len(self.order)):
+            self.positions[self.order[pos]] = pos
+        self.ordered = False
+
+    def search(self, term, limit=1, start=None, end=None):
+        if(limit <= 0):
+            return
+        if(not self.built):
+            self._build()
+
+        span = None
+        if(start is not None):
+            span = (start, end)
+            # a small enough span is quicker to check entry by entry than to filter the postings
+            if(end - start <= len(self._rarestCharCandidates(term))):
+                yield from self._searchTiers(self._spanTiers(term, self.order[start:end]), limit)
+                return
+
+        noSpace = ' ' not in term
+        spaceAccounting = self.noSpaceNames if noSpace else self.names
+        yield from self._searchTiers(self._tiers(
+            term,
+            (self._exactCandidates(term, noSpace), lambda i: spaceAccounting[i] == term),
+            (self._prefixCandidates(term, noSpace), lambda i: spaceAccounting[i].startswith(term)),
+            (self._containedCandidates(term), lambda i: term in spaceAccounting[i]),
+        ), limit, span)
+
+    # every tier as (candidate indices, check), in rank order; a check of None accepts every candidate
+    def _tiers(self, term, exactTier, prefixedTier, containedTier):
+        noSpace = ' ' not in term
+        candidates = self._sequenceCandidates(term)
+        return (
+            exactTier,
+            (self.firstWordPostings.get(term, []) if noSpace else [], None),
+            (self.restWordPostings.get(term, []) if noSpace else [], None),
+            prefixedTier,
+            (candidates[0], lambda i: containsContinuousPrefixedSequence(self.names[i], term, 1)),
+            (candidates[1], lambda i: containsPrefixedSequence(self.names[i], term)),
+            containedTier,
+        )
+
+    # every tier checked entry by entry, over the same candidates
+    def _spanTiers(self, term, candidates):
+        noSpace = ' ' not in term
+        spaceAccounting = self.noSpaceNames if noSpace else self.names
+
+        def wordTier(i):
+            words = self.names[i].split(" ")
+            if(not noSpace or len(words) < 2):
+                return None
+            return 0 if words[0] == term else 1 if term in words[1:] else None
+
+        return (
+            (candidates, lambda i: spaceAccounting[i] == term),
+            (candidates, lambda i: wordTier(i) == 0),
+            (candidates, lambda i: wordTier(i) == 1),
+            (candidates, lambda i: spaceAccounting[i].startswith(term)),
+            (candidates, lambda i: containsContinuousPrefixedSequence(self.names[i], term, 1)),
+            (candidates, lambda i: containsPrefixedSequence(self.names[i], term)),
+            (candidates, lambda i: term in spaceAccounting[i]),
+        )
+
+    def _searchTiers(self, tiers, limit, span=None):
+        found = 0
+        matched = set()
+        for candidates, check in tiers:
+            for i in self._ranked(candidates, span):
+                if(i in matched):
+                    continue
+                if(check and not check(i)):
+                    continue
+                matched.add(i)
+                yield i
+                found += 1
+                if(found >= limit):
+                    return
+
+    # drops removed entries (and entries outside the span), and puts the rest in rank order
+    def _ranked(self, candidates, span=None):
+        if(self.count < len(self.names)):
+            candidates = [i for i in candidates if self.names[i] is not None]
+        if(span):
+            start, end = span
+            candidates = [i for i in candidates if start <= self.positions[i] < end]
+        if(self.ordered):
+            return sorted(candidates)
+        return sorted(candidates, key=lambda i: (len(self.names[i]), self.positions[i]))
+
+    # an entry can only match if it contains every (non-space) character of the term
+    def _rarestCharCandidates(self, term):
+        charLists = [self.charPostings.get(c, []) for c in set(term.replace(' ', ''))]
+        if(not charLists):
+            return range(len(self.names))
+        return min(charLists, key=len)
+
+    def _containedCandidates(self, term):
+        strippedTerm = term.replace(' ', '')
+        if(len(strippedTerm) < 3):
+            return self._rarestCharCandidates(term)
+        grams = set(strippedTerm[j:j+3] for j in range(len(strippedTerm) - 2))
+        return min((self.trigramPostings.get(gram, []) for gram in grams), key=len)
+
+    # candidates for the continuous prefixed sequence and prefixed sequence tiers
+    def _sequenceCandidates(self, term):
+        if(not term or term[0] == ' '):
+            candidates = self._rarestCharCandidates(term)
+            return candidates, candidates
+        return self.firstCharPostings.get(term[0], []), self.initialPostings.get(term[0], [])
+
+    def _exactCandidates(self, term, noSpace):
+        if(noSpace):
+            return self.exactNoSpacePostings.get(term, [])
+        return self.exactPostings.get(term, [])
+
+    def _prefixCandidates(self, term, noSpace):
+        table = self.noSpacePrefixTable if noSpace else self.prefixTable
+        candidates = list()
+        pos = bisect.bisect_left(table, (term,))
+        while(pos < len(table) and table[pos][0].startswith(term)):
+            candidates.append(table[pos][1])
+            pos += 1
+        return candidates
@@ -0,0 +1,287 @@
+import threading
+import time
+
+import vlc
+
+from AudioBackend import AudioBackend
+from CommandQueue import CommandQueue, MergedCommand
+from PositionClock import PositionClock
+
+
+# plays songs through vlc, without a gap between them: a little before a song ends, the next one is opened
+# (muted and paused) on a second player, so the players can just be swapped when the current song ends
+#
+# vlc's events come in on vlc's own threads, which mustn't call back into vlc,
+# so they're handled one at a time on a queue of their own
+#
+# seeks go straight to the live player with set_time, but no more than one every seekIntervalMs
+# (any in between are held back, and only the newest is made once the interval is up),
+# and the position comes from a clock of our own, since the player's lags behind a seek
+class VlcBackend(AudioBackend):
+    # (instanceArgs are passed on to vlc, like "--aout=adummy" to play without an audio device)
+    def __init__(self, nextTrack, onTrackChanged, onEnd, prefetchMs=5000, seekIntervalMs=50, instanceArgs=()):
+        super().__init__(nextTrack, onTrackChanged, onEnd)
+        self.prefetchMs = prefetchMs
+        self.seekIntervalMs = seekIntervalMs
+
+        # the instance and players live for the whole session; songs are swapped in with set_media
+        self.instance = vlc.Instance(*instanceArgs)
+        self.player = self.instance.media_player_new()
+        self.nextPlayer = self.instance.media_player_new()
+        self.events = CommandQueue()
+        self.lock = threading.RLock()
+
+        # (path, tag) of the song on player, and of the one opened on nextPlayer
+        # (next is False if nextTrack had nothing to follow the current song)
+        self.current = None
+        self.next = None
+        self.nextReady = False
+        self.wantsNext = False
+        # bumped whenever the current song is replaced, so anything still being done for the old one is dropped
+        self.generation = 0
+        # bumped whenever what's on nextPlayer is thrown away, so an opening still under way is dropped too
+        self.nextGeneration = 0
+        self.paused = False
+        # whether the current song has been opened on player yet (a song played while paused isn't, until unpause),
+        # and where it should start when it is
+        self.started = False
+        self.startMs = 0
+        self.volume = 100
+        self.clock = PositionClock()
+
+        # the newest seek that's been held back (or None), when the last one was made,
+        # and whether the held back one is already waiting on a timer
+        self.seekTarget = None
+        self.lastSeek = 0
+        self.seekTimer = None
+
+        for player in (self.player, self.nextPlayer):
+            self.attachEvents(player)
+
+    def attachEvents(self, player):
+        events = player.event_manager()
+        # (a backlog of time changes is merged into the newest one)
+        events.event_attach(vlc.EventType.MediaPlayerTimeChanged,
+            lambda e : self.events.put(MergedCommand(("time", id(player)), self.onTimeChanged, player, summed=False)))
+        events.event_attach(vlc.EventType.MediaPlayerEndReached,
+            lambda e : self.events.put(lambda : self.onPlayerEnd(player)))
+
+    def load(self, player, path, startMs=0):
+        media = self.instance.media_new_path(path)
+        if(startMs > 0):
+            media.add_option(f"start-time={startMs / 1000:.3f}")
+        # the player keeps its own reference to the media
+        player.set_media(media)
+        media.release()
+
+    def play(self, path, tag=None, startMs=0):
+        with self.lock:
+            self._replaceCurrent((path, tag), startMs)
+
+    def seek(self, ms):
+        with self.lock:
+            if(not self.current):
+                return
+            self.clock.set(ms)
+            # a song that hasn't been opened yet just opens at the new time
+            if(not self.started):
+                self.startMs = ms
+                return
+
+            self.seekTarget = ms
+            wait = self.lastSeek + self.seekIntervalMs / 1000 - time.monotonic()
+            if(wait <= 0):
+                self._applySeek()
+            elif(not self.seekTimer):
+                self.seekTimer = threading.Timer(wait, lambda : self.events.put(self._flushSeek))
+                self.seekTimer.daemon = True
+                self.seekTimer.start()
+
+    # (a player that's still opening its song can't seek yet; the seek is made once it's playing)
+    def _applySeek(self):
+        if(not self.player.is_seekable()):
+            return
+        self.player.set_time(self.seekTarget)
+        self.seekTarget = None
+        self.lastSeek = time.monotonic()
+
+    def _flushSeek(self):
+        with self.lock:
+            self.seekTimer = None
+            if(self.seekTarget is not None):
+                self._applySeek()
+
+    def stop(self):
+        with self.lock:
+            self._replaceCurrent(None, 0)
+
+    # lets go of the players and the instance, and stops the event queue
+    # (a command already running on the queue may be waiting on the player, which may be who's closing us,
+    # so it isn't waited for; once the song is gone, it sees it's out of date and leaves the players alone)
+    def close(self):
+        with self.lock:
+            if(self.seekTimer):
+                self.seekTimer.cancel()
+                self.seekTimer = None
+            self._replaceCurrent(None, 0)
+            self.events.close(wait=False)
+            self.player.release()
+            self.nextPlayer.release()
+            self.instance.release()
+
+    def pause(self):
+        with self.lock:
+            self.paused = True
+            self.clock.stop()
+            if(self.started):
+                self.player.set_pause(True)
+
+    def unpause(self):
+        with self.lock:
+            self.paused = False
+            if(not self.current):
+                return
+            if(self.started):
+                self.player.set_pause(False)
+            else:
+                self._start()
+            self.clock.start()
+
+    def setVolume(self, volume):
+        with self.lock:
+            self.volume = int(round(volume * 100))
+            self.player.audio_set_volume(self.volume)
+
+    def getPos(self):
+        with self.lock:
+            return self.clock.pos()
+
+    def getLength(self):
+        with self.lock:
+            # vlc reports a length of 0 until it knows better
+            length = self.player.get_length() if self.current and self.started else 0
+            return length if length > 0 else -1
+
+    def dropNext(self):
+        with self.lock:
+            self._dropNext()
+
+    def _dropNext(self):
+        self.nextGeneration += 1
+        self.next = None
+        self.nextReady = False
+        self.wantsNext = False
+        self.nextPlayer.stop()
+
+    def _replaceCurrent(self, track, startMs):
+        self.generation += 1
+        self._dropNext()
+        self.seekTarget = None
+        self.player.stop()
+
+        self.current = track
+        self.started = False
+        self.startMs = startMs
+        self.clock.stop()
+        self.clock.set(startMs)
+        if(track and not self.paused):
+            self._start()
+            self.clock.start()
+
+    # opens the current song on player, and starts it
+    def _start(self):
+        self.started = True
+        self.load(self.player, self.current[0], self.startMs)
+        self.player.play()
+
+    # (called on the event queue)
+    def onTimeChanged(self, player):
+        with self.lock:
+            if(player is not self.player or not self.current):
+                return
+            # a seek made while the song was still opening
+            if(self.seekTarget is not None and not self.seekTimer):
+                self._applySeek()
+            self.clock.correct(player.get_time())
+            length = player.get_length()
+            if(self.next is not None or self.wantsNext or length <= 0 or length - self.clock.pos() > self.prefetchMs):
+                return
+            self.wantsNext = True
+            generation = self.nextGeneration
+        self._openNext(generation)
+
+    # asks for the song to play next (outside the lock, since nextTrack belongs to the player),
+    # and starts it muted on the spare player to get it opened and decoding, then holds it at the beginning
+    def _openNext(self, generation):
+        upcoming = self._askNext()
+        with self.lock:
+            if(generation != self.nextGeneration):
+                return
+            self.wantsNext = False
+            self.next = upcoming or False
+            if(not upcoming):
+                return
+            self.load(self.nextPlayer, upcoming[0])
+            self.nextPlayer.audio_set_volume(0)
+            self.nextPlayer.play()
+        self._pollNext(generation, time.monotonic() + 5)
+
+    # checks whether the spare player is playing yet (giving up at the deadline), and if not, checks again
+    # a little later from a timer, so the event queue isn't held up while vlc opens the song
+    def _pollNext(self, generation, deadline):
+        with self.lock:
+            if(generation != self.nextGeneration):
+                return
+            state = self.nextPlayer.get_state()
+            if(state not in (vlc.State.Playing, vlc.State.Error) and time.monotonic() < deadline):
+                timer = threading.Timer(0.01, lambda : self.events.put(lambda : self._pollNext(generation, deadline)))
+                timer.daemon = True
+                timer.start()
+                return
+            if(state != vlc.State.Playing):
+                # it'll be opened on the main player when the current song ends instead
+                self.nextPlayer.stop()
+                return
+            self.nextPlayer.set_pause(True)
+            self.nextPlayer.set_time(1)
+            self.nextReady = True
+
+    def _askNext(self):
+        try:
+            return self.nextTrack()
+        except BaseException as excep:
+            print(excep)
+            return None
+
+    def onPlayerEnd(self, player):
+        with self.lock:
+            if(player is not self.player or not self.current):
+                return
+            upcoming, generation = self.next, self.generation
+        # the end came before it was seen coming (like in a very short song), so the next song is asked for now
+        if(upcoming is None):
+            upcoming = self._askNext()
+
+        with self.lock:
+            if(generation != self.generation):
+                return
+            if(upcoming and self.nextReady):
+                self.player, self.nextPlayer = self.nextPlayer, self.player
+                self.player.audio_set_volume(self.volume)
+                self.player.set_pause(False)
+                self.nextPlayer.stop()
+                self.generation += 1
+                self.nextGeneration += 1
+                self.next = None
+                self.nextReady = False
+                self.current = upcoming
+                self.started = True
+                self.seekTarget = None
+                self.clock.set(0)
+            else:
+                self._replaceCurrent(upcoming or None, 0)
+
+        if(upcoming):
+            self.onTrackChanged(upcoming[1])
+        else:
+            self.onEnd()
@@ -0,0 +1,82 @@
+import random
+import sys
+import time
+
+from Radium import Radium
+
+# runs the whole player (library loading, searches, the queue and autoplay) on the null backend,
+# so it can be timed without an audio device, the status icon or the key hook
+# songs are the null backend's default length unless their metadata says otherwise,
+# and autoplay runs through them on its virtual clock, as fast as the player can keep up
+#
+# usage: python3 controllerBenchmark.py <audio directory> [songs=<n>] [searches=<n>]
+
+searchTerms = ["a", "ab", "abc", "+a", "-b", "*", "@+a", "@-a", "a; b; c"]
+
+
+def timed(label, rounds, run):
+    start = time.perf_counter()
+    run()
+    elapsed = time.perf_counter() - start
+    print(f"{label:>12}: {elapsed * 1e6 / rounds:9.1f} us each  ({rounds} rounds)")
+
+
+def makePlayer(audioDirectory):
+    rad = Radium()
+    rad.audioDirectory = audioDirectory
+    rad.acceptedAudioTypes = {"mp3", "m4a", "flac", "ogg"}
+    rad.libraryCachePath = None
+    rad.historyPath = None
+    rad.metadataCachePath = None
+    rad.watchLibrary = False
+    rad.timeModifyAmount = 5000
+    rad.volumeModifyAmount = 5
+    rad.audioBackend = "null"
+    # the clock only moves when it's told to
+    rad.nullBackendSpeed = 0
+    return rad
+
+
+def searches(rad, rounds):
+    for i in range(rounds):
+        term = searchTerms[i % len(searchTerms)]
+        rad.commands.call(lambda: rad.processSearchEntry(term))
+
+
+def queueing(rad, rounds):
+    for i in range(rounds):
+        song = random.choice(rad.songs)
+        rad.commands.put(lambda: (rad.songQueue.append(song), rad.songQueueUpdated()))
+    rad.commands.call(rad.clearQueue)
+
+
+def autoplay(rad, rounds):
+    rad.commands.call(rad.playNext)
+    for i in range(rounds):
+        rad.commands.call(lambda: rad.backend.advance(rad.backend.getLength()))
+
+
+def seeks(rad, rounds):
+    for i in range(rounds):
+        rad.commands.call(lambda: rad.seekPercent(i % 10 * 10))
+
+
+if __name__ == "__main__":
+    audioDirectory = sys.argv[1]
+    args = dict(arg.split("=") for arg in sys.argv[2:])
+    songs = int(args.get("songs", 1000))
+    searchCount = int(args.get("searches", 1000))
+
+    rad = makePlayer(audioDirectory)
+    timed("load", 1, lambda: rad.commands.call(rad.loadSongList))
+    rad.commands.call(rad.setupBackend)
+    print(f"{len(rad.songs)} songs, {len(rad.macros)} macros")
+
+    timed("search", searchCount, lambda: searches(rad, searchCount))
+    # autoplay picks from the whole library again
+    rad.commands.call(lambda: (rad.activeSongs.clear(), rad.activeSongsUpdated()))
+    timed("queue", songs, lambda: queueing(rad, songs))
+    timed("song change", songs, lambda: autoplay(rad, songs))
+    timed("seek", songs, lambda: seeks(rad, songs))
+    print(f"{rad.backend.songsPlayed} songs played, {len(rad.historyStack)} in the history")
+    print(f"command wait: {rad.commands.waitLatency.describe()}")
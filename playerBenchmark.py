@@ -0,0 +1,136 @@
+import os
+import sys
+import threading
+import time
+
+import vlc
+
+from VlcBackend import VlcBackend
+
+# times radium's vlc backend on a null audio output: song changes on one long-lived backend (which swaps media
+# on its player) against a new backend for every song (the old way: a new vlc instance and player every time),
+# and seeks on the live player, which the backend holds back to one every seekIntervalMs
+#
+# also measures the gap between one song ending and the next one playing, through the backend's own song changes:
+# opening the next song only once the first has ended, against swapping to one prefetched on its spare player
+#
+# usage: python3 playerBenchmark.py <audio file> [more audio files...] [rounds=<n>]
+
+instanceArgs = ["--aout=adummy"]
+
+
+def makeBackend(nextTrack=lambda : None, onTrackChanged=lambda tag : None, onEnd=lambda : None, **kwargs):
+    return VlcBackend(nextTrack, onTrackChanged, onEnd, instanceArgs=instanceArgs, **kwargs)
+
+
+def waitUntilPlaying(player, timeout=5):
+    deadline = time.perf_counter() + timeout
+    while(player.get_state() != vlc.State.Playing and time.perf_counter() < deadline):
+        time.sleep(0.001)
+
+
+def fresh(paths, rounds):
+    backend = None
+    start = time.perf_counter()
+    for i in range(rounds):
+        if(backend):
+            backend.close()
+        backend = makeBackend()
+        backend.play(paths[i % len(paths)])
+        waitUntilPlaying(backend.player)
+        backend.seek(10000)
+    elapsed = time.perf_counter() - start
+    backend.close()
+    return elapsed
+
+
+def reused(paths, rounds):
+    backend = makeBackend()
+    start = time.perf_counter()
+    for i in range(rounds):
+        backend.play(paths[i % len(paths)])
+        waitUntilPlaying(backend.player)
+        backend.seek(10000)
+    elapsed = time.perf_counter() - start
+    backend.close()
+    return elapsed
+
+
+# seeks as fast as they come, then waits for the last one (which may have been held back) to reach the player
+def seeks(paths, rounds):
+    backend = makeBackend()
+    backend.play(paths[0])
+    waitUntilPlaying(backend.player)
+    start = time.perf_counter()
+    for i in range(rounds):
+        backend.seek(1000 + (i % 10) * 1000)
+    calls = time.perf_counter() - start
+    while(backend.seekTarget is not None):
+        time.sleep(0.001)
+    settled = time.perf_counter() - start
+    backend.close()
+    return calls, settled
+
+
+# plays the last few seconds of a song on a backend whose nextTrack hands it nextPath,
+# and returns the time from the song's end to the next song playing, as the backend's own end-of-song handling gets there
+def transitionGap(path, nextPath, prefetchMs):
+    changed = threading.Event()
+    ended = threading.Event()
+    endTime = [0]
+
+    def onEnd(e):
+        endTime[0] = time.perf_counter()
+        ended.set()
+
+    backend = makeBackend(lambda : (nextPath, "next"), lambda tag : changed.set(), prefetchMs=prefetchMs)
+    backend.play(path, "first")
+    waitUntilPlaying(backend.player)
+    while(backend.getLength() <= 0):
+        time.sleep(0.001)
+    backend.player.event_manager().event_attach(vlc.EventType.MediaPlayerEndReached, onEnd)
+    backend.seek(max(1, backend.getLength() - 3000))
+    ended.wait(10)
+
+    # (the backend has swapped players, or opened the next song on the same one, by the time it says the song changed)
+    changed.wait(10)
+    waitUntilPlaying(backend.player)
+    gap = time.perf_counter() - endTime[0]
+    backend.close()
+    return gap
+
+
+# with a prefetch time of 0, the end always comes before it's seen coming, so the next song is only asked for
+# and opened once the first has ended; otherwise it's opened on the spare player a few seconds ahead
+def gaps(paths, rounds):
+    unbuffered = 0
+    prefetched = 0
+    for i in range(rounds):
+        path = paths[i % len(paths)]
+        nextPath = paths[(i + 1) % len(paths)]
+        unbuffered += transitionGap(path, nextPath, 0)
+        prefetched += transitionGap(path, nextPath, 5000)
+    return unbuffered, prefetched
+
+
+def timed(label, rounds, elapsed, unit="change"):
+    print(f"{label:>16}: {elapsed * 1000 / rounds:9.2f} ms per {unit}  ({rounds} rounds)")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    rounds = 20
+    for arg in args:
+        if(arg.startswith("rounds=")):
+            rounds = int(arg.split("=")[1])
+    paths = [os.path.abspath(arg) for arg in args if not arg.startswith("rounds=")]
+
+    timed("new backend", rounds, fresh(paths, rounds))
+    timed("reused backend", rounds, reused(paths, rounds))
+    calls, settled = seeks(paths, rounds)
+    timed("seek call", rounds, calls, "seek")
+    timed("seeks settled", rounds, settled, "seek")
+
+    unbuffered, prefetched = gaps(paths, rounds)
+    timed("gap, open at end", rounds, unbuffered)
+    timed("gap, prefetched", rounds, prefetched)
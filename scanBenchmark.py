@@ -0,0 +1,59 @@
+import os
+import sys
+import time
+
+from LibraryCache import LibraryCache, describeFile
+
+# times a full library scan: the old single-threaded os.walk loop against LibraryCache.walk
+# (no cache file, so every directory is listed) with different numbers of scan workers
+#
+# usage: python3 scanBenchmark.py <audio directory> [worker counts...] [latency=<ms>]
+# latency adds a fixed delay to every directory listing, to mimic a network share on a local disk
+
+acceptedAudioTypes = {"mp3", "m4a", "flac", "ogg"}
+
+
+def osWalkScan(audioDirectory):
+    found = 0
+    for root, dirs, files in os.walk(audioDirectory):
+        dirs[:] = filter(lambda name: name[0] != ".", dirs)
+        for file in files:
+            fileType, _, _ = describeFile(file)
+            if(fileType == "smco" or fileType in acceptedAudioTypes):
+                found += 1
+    return found
+
+
+def cacheScan(audioDirectory, workers):
+    found = 0
+    for _, _, files in LibraryCache(None, audioDirectory, acceptedAudioTypes, workers).walk():
+        found += len(files)
+    return found
+
+
+def timed(label, scan):
+    start = time.perf_counter()
+    found = scan()
+    print(f"{label:>12}: {(time.perf_counter() - start) * 1000:9.1f} ms  ({found} files)")
+
+
+def addListingLatency(ms):
+    scandir = os.scandir
+
+    def slowScandir(*args):
+        time.sleep(ms / 1000)
+        return scandir(*args)
+    os.scandir = slowScandir
+
+
+if __name__ == "__main__":
+    audioDirectory = sys.argv[1]
+    args = sys.argv[2:]
+    for arg in args:
+        if(arg.startswith("latency=")):
+            addListingLatency(float(arg.split("=")[1]))
+    workerCounts = [int(arg) for arg in args if arg.isdigit()] or [1, 4, 8, 16]
+
+    timed("os.walk", lambda: osWalkScan(audioDirectory))
+    for workers in workerCounts:
+        timed(f"{workers} workers", lambda: cacheScan(audioDirectory, workers))
@@ -0,0 +1,169 @@
+import os
+import random
+import shutil
+import tempfile
+import unittest
+from collections import namedtuple
+from unittest import mock
+
+from Radium import Radium
+
+# drives the player the way the key hook, the search dialog and the backend do, on the null backend,
+# waiting for the command queue to run everything that was put in before checking on it
+# (the null backend's clock only moves when it's told to, so songs only end when a test ends them)
+
+KeyEvent = namedtuple("KeyEvent", ["event_type", "name"])
+
+songPaths = [
+    "rock/alpha song.mp3",
+    "rock/beta tune.mp3",
+    "jazz/gamma.mp3",
+    "jazz/delta blues.mp3",
+    "epsilon.mp3",
+]
+
+
+class RadiumTest(unittest.TestCase):
+    def setUp(self):
+        random.seed(0)
+        self.audioDirectory = tempfile.mkdtemp()
+        for path in songPaths:
+            path = os.path.join(self.audioDirectory, path)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            open(path, "w").close()
+
+        rad = Radium()
+        rad.audioDirectory = self.audioDirectory
+        rad.acceptedAudioTypes = {"mp3"}
+        rad.libraryCachePath = None
+        rad.historyPath = None
+        rad.metadataCachePath = None
+        rad.watchLibrary = False
+        rad.timeModifyAmount = 5000
+        rad.volumeModifyAmount = 5
+        rad.audioBackend = "null"
+        rad.nullBackendSpeed = 0
+        self.rad = rad
+
+        rad.commands.call(rad.loadSongList)
+        rad.commands.call(rad.setupBackend)
+        # (without hooking the real keyboard, even where the keyboard module is installed)
+        with mock.patch("Radium.keyboard", None):
+            rad.commands.call(rad.setupKeybinds)
+
+    def tearDown(self):
+        self.rad.commands.call(self.rad.backend.close)
+        self.rad.historyStack.close()
+        shutil.rmtree(self.audioDirectory)
+
+    def settle(self):
+        self.rad.commands.call(lambda : None)
+
+    def press(self, key):
+        for name in ("ctrl", "shift", key):
+            self.rad.keyEvent(KeyEvent("down", name))
+        for name in (key, "shift", "ctrl"):
+            self.rad.keyEvent(KeyEvent("up", name))
+        self.settle()
+
+    # what the search dialog hands over once something's been entered
+    def search(self, entry):
+        with mock.patch.object(self.rad, "openSearchScript", return_value=entry):
+            self.rad._handleSearch()
+        self.settle()
+
+    def endSong(self):
+        backend = self.rad.backend
+        backend.advance(backend.getLength() - backend.getPos())
+        self.settle()
+
+    def song(self, name):
+        return next(song for song in self.rad.songs if self.rad.songTable.name(song) == name)
+
+    def queue(self):
+        return [self.rad.songTable.name(song) for song in self.rad.songQueue]
+
+    def current(self):
+        return self.rad.songTable.name(self.rad.currentSong)
+
+    def lastInHistory(self):
+        return os.path.splitext(os.path.basename(self.rad.historyStack.last()[0]))[0]
+
+    def test_searchQueues(self):
+        self.search("alpha, gamma")
+        self.assertEqual(self.queue(), ["alpha song", "gamma"])
+        self.search("+delta")
+        self.assertEqual(self.queue(), ["alpha song", "gamma", "delta blues"])
+        self.search("beta")
+        self.assertEqual(self.queue(), ["beta tune", "alpha song", "gamma", "delta blues"])
+        self.press("c")
+        self.assertEqual(self.queue(), [])
+
+    def test_nextAndPrev(self):
+        self.search("+beta, gamma")
+        self.press(".")
+        self.assertEqual(self.current(), "beta tune")
+        self.assertTrue(self.rad.playing)
+        self.assertEqual(self.queue(), ["gamma"])
+
+        self.press(".")
+        self.assertEqual(self.current(), "gamma")
+        self.assertEqual(self.lastInHistory(), "beta tune")
+
+        self.press(",")
+        self.assertEqual(self.current(), "beta tune")
+        self.assertEqual(len(self.rad.historyStack), 0)
+
+    def test_songEndTakesTheQueue(self):
+        self.search("+alpha, beta")
+        self.press(".")
+        self.endSong()
+        self.assertEqual(self.current(), "beta tune")
+        self.assertEqual(self.queue(), [])
+        self.assertEqual(self.lastInHistory(), "alpha song")
+        self.assertEqual(self.rad.backend.songsPlayed, 2)
+
+    # the backend asks what's next a little before the end; nothing is taken until it moves on to it
+    def test_askingForTheNextSongTakesNothing(self):
+        self.search("+alpha, beta, gamma")
+        self.press(".")
+        upcoming = self.rad.commands.call(self.rad.upcomingSong)
+        self.assertEqual(upcoming[1], self.song("beta tune"))
+        self.assertEqual(self.queue(), ["beta tune", "gamma"])
+
+        # cutting to the next song in the meantime plays the song that was asked for, and keeps the rest
+        self.press(".")
+        self.assertEqual(self.current(), "beta tune")
+        self.assertEqual(self.queue(), ["gamma"])
+
+    def test_loopAndAutoplay(self):
+        self.search("+alpha, beta")
+        self.press(".")
+        self.press("l")
+        self.endSong()
+        self.assertEqual(self.current(), "alpha song")
+        self.assertEqual(self.queue(), ["beta tune"])
+        self.assertEqual(len(self.rad.historyStack), 0)
+
+        self.press("l")
+        self.press("a")
+        self.endSong()
+        self.assertTrue(self.rad.songEnded)
+        self.assertFalse(self.rad.playing)
+        self.assertEqual(self.queue(), ["beta tune"])
+
+    def test_autoplayKeepsToActiveSongs(self):
+        self.search("@jazz/")
+        self.assertEqual({self.rad.songTable.name(song) for song in self.rad.activeSongs}, {"gamma", "delta blues"})
+        self.assertEqual(self.queue(), [])
+
+        self.press(".")
+        for _ in range(10):
+            self.assertIn(self.current(), ("gamma", "delta blues"))
+            self.endSong()
+        self.assertEqual(self.rad.backend.songsPlayed, 11)
+        self.assertIn(self.lastInHistory(), ("gamma", "delta blues"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+import random
+import unittest
+
+from StringSearch import containsContinuousPrefixedSequence, containsPrefixedSequence
+
+# the recursive matchers the bitmask ones replaced, kept as the reference they're checked against
+
+def recursiveContinuousPrefixedSequence(string, term, spaces=0):
+    if(spaces > 1):
+        return False
+
+    if(len(term) > len(string)):
+        return False
+
+    if(len(term) == 0):
+        return True
+
+    if(term[0] == ' '):
+        nextSpacePos = string.find(' ')
+        return recursiveContinuousPrefixedSequence(string[nextSpacePos+1:], term[1:])
+
+    thisAndRest = (term[0] == string[0] and recursiveContinuousPrefixedSequence(string[1:], term[1:]))
+    if(thisAndRest):
+        return True
+
+    nextSpacePos = string.find(' ')
+    if(nextSpacePos >= 0):
+        return recursiveContinuousPrefixedSequence(string[nextSpacePos+1:], term, spaces+1)
+    return False
+
+def recursivePrefixedSequence(string, term):
+    if(len(term) > len(string)):
+        return False
+
+    if(len(term) == 0):
+        return True
+
+    if(term[0] == ' '):
+        nextSpacePos = string.find(' ')
+        return recursivePrefixedSequence(string[nextSpacePos+1:], term[1:])
+
+    thisAndRest = (term[0] == string[0] and recursivePrefixedSequence(string[1:], term[1:]))
+    if(thisAndRest):
+        return True
+
+    nextSpacePos = string.find(' ')
+    if(nextSpacePos >= 0):
+        return recursivePrefixedSequence(string[nextSpacePos+1:], term)
+    return False
+
+
+# a small alphabet (and plenty of spaces, doubled up and at the ends too) so most pairs get somewhere interesting
+def randomText(rand, maxLen):
+    return "".join(rand.choice("abc  ") for _ in range(rand.randint(0, maxLen)))
+
+class PrefixedSequenceTest(unittest.TestCase):
+    def test_matchesRecursive(self):
+        rand = random.Random(2)
+        for _ in range(20000):
+            string = randomText(rand, 14)
+            term = randomText(rand, 6)
+            self.assertEqual(containsPrefixedSequence(string, term),
+                recursivePrefixedSequence(string, term), (string, term))
+            for spaces in (0, 1, 2):
+                self.assertEqual(containsContinuousPrefixedSequence(string, term, spaces),
+                    recursiveContinuousPrefixedSequence(string, term, spaces), (string, term, spaces))
+
+    def test_examples(self):
+        self.assertTrue(containsPrefixedSequence("the quick brown fox", "tqbf"))
+        self.assertTrue(containsPrefixedSequence("the quick brown fox", "quickf"))
+        self.assertFalse(containsPrefixedSequence("the quick brown fox", "uick"))
+        # (leaving the rest of a word counts as skipping it)
+        self.assertTrue(containsContinuousPrefixedSequence("the quick brown fox", "thqu", 1))
+        self.assertFalse(containsContinuousPrefixedSequence("the quick brown fox", "thbr", 1))
+        self.assertTrue(containsContinuousPrefixedSequence("the quick brown fox", "th br"))
+
+    # long enough for the recursion to hit its limit
+    def test_long(self):
+        string = " ".join(["ab"] * 2000)
+        self.assertTrue(containsPrefixedSequence(string, "a" * 2000))
+        self.assertFalse(containsPrefixedSequence(string, "a" * 2000 + "c"))
+        self.assertTrue(containsContinuousPrefixedSequence(string, "ab" * 2000, 1))
+        self.assertFalse(containsContinuousPrefixedSequence(string, "ab" * 1999 + "bb", 1))
+
+
+if __name__ == "__main__":
+    unittest.main()